@@ -1,11 +1,22 @@
 import streamlit as st
 import os
-import random
-import json
-from utils import get_answer, text_to_speech, autoplay_audio, speech_to_text
+import time
+import uuid
+from utils import get_answer, stream_answer, text_to_speech, stream_speech, autoplay_audio_stream, enqueue_audio_segment, speech_to_text, transcript_scope
+from utilities.speech_pipeline import split_sentences, speak_sentences
 from audio_recorder_streamlit import audio_recorder
 from streamlit_float import *
 from sentence_transformers import SentenceTransformer, util
+from utilities.embedding_store import get_embedding_store
+from utilities.similarity import batch_semantic_similarity
+from utilities.model_registry import register_resource, get_resource, warm_up, resource_stats
+from utilities.storage import get_storage
+from utilities.question_bank import load_question_bank, topic_weights, format_question_list
+from utilities.context_window import ContextWindow
+from utilities.tracing import Histograms, span, record, process_histograms, start_exporters
+from utilities.tts_cache import tts_cache
+from utilities.audio_preprocess import preprocess_stats
+from utilities.transcript_cache import transcript_cache, audio_fingerprint
 
 st.set_page_config(
     page_title="Interview Bot",
@@ -17,12 +28,28 @@ st.set_page_config(
 # Float feature initialization
 float_init()
 
-# Load questions from JSON file
-with open("koshen.json", "r", encoding="utf-8") as file:
-    questions_data = json.load(file)
+MODEL_NAME = 'all-MiniLM-L6-v2'
 
-# Initialize the NLP model for semantic similarity
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# The indexed question bank and the NLP model for semantic similarity are loaded once per server
+# process, so neither a rerun nor a new session pays for them again. The warm-up starts in the
+# background on the first run of this script in the process; a failed load is retried (and its
+# error shown) by the next get_resource call.
+register_resource("question_bank", load_question_bank)
+register_resource("sentence_model", lambda: SentenceTransformer(MODEL_NAME))
+warm_up()
+
+question_bank = get_resource("question_bank")
+
+# Stage latencies go to per-process histograms; TRACE_EXPORT=jsonl/prometheus exports them
+start_exporters()
+
+# Per-learner level progress is persisted in the shared SQLite store
+storage = get_storage()
+
+# Embeddings are cached in memory by text hash; interview answers and generated expected answers
+# never go to the disk cache
+def get_similarity_store():
+    return get_embedding_store(get_resource("sentence_model"), MODEL_NAME)
 
 # Define interview scenarios, levels, and their respective system prompts
 scenarios = {
@@ -84,6 +111,7 @@ content = {
 levels = ["Beginner", "Intermediate", "Hard"]
 
 EVALUATION_THRESHOLD = 0.6  # Set the evaluation metric threshold here
+STREAMING_RESPONSES = True  # Speak the reply sentence by sentence while it is still being generated
 
 def initialize_session_state():
     if "messages" not in st.session_state:
@@ -94,8 +122,13 @@ def initialize_session_state():
         st.session_state.selected_level = "Beginner"
     if "answers" not in st.session_state:
         st.session_state.answers = []
+    if "learner_id" not in st.session_state:
+        # Kept in the URL so a learner's progress survives reloads and "End Session"
+        st.session_state.learner_id = st.query_params.get("learner") or uuid.uuid4().hex
+        st.query_params["learner"] = st.session_state.learner_id
     if "level_progress" not in st.session_state:
         st.session_state.level_progress = {"Java Interview": "Beginner", "Excel Interview": "Beginner", "Python Interview": "Beginner", "Kotlin Interview": "Beginner", "ReactJS Interview": "Beginner"}
+        st.session_state.level_progress.update(storage.get_level_progress(st.session_state.learner_id))
     if "incorrect_attempts" not in st.session_state:
         st.session_state.incorrect_attempts = 0
     if "max_questions" not in st.session_state:
@@ -106,6 +139,11 @@ def initialize_session_state():
         st.session_state.introduction_given = False
     if "user_introduction" not in st.session_state:
         st.session_state.user_introduction = ""
+    if "context_window" not in st.session_state:
+        # Recent turns verbatim plus a rolling summary of older ones, so long interviews stay bounded
+        st.session_state.context_window = ContextWindow()
+    if "traces" not in st.session_state:
+        st.session_state.traces = Histograms()
 
 initialize_session_state()
 
@@ -148,6 +186,7 @@ with col2:
 with col3:
     # End session button
     if st.button("End Session"):
+        transcript_cache.clear_scope(st.session_state.get("transcript_scope"))
         st.session_state.clear()
         initialize_session_state()
         st.rerun()
@@ -172,56 +211,130 @@ if selected_scenario != st.session_state.selected_scenario:
     st.session_state.introduction_given = False
     st.session_state.user_introduction = ""
 
+# Function to draw the interview's questions once per scenario, level and length. Questions the
+# learner has been asked before come last and weak topics are favoured.
 def get_random_questions(scenario, level, num_questions):
-    questions = questions_data[scenario][level]
-    selected_questions = random.sample(questions, num_questions)
-    return selected_questions
-
-system_prompt = scenarios[selected_scenario][st.session_state.level_progress[selected_scenario]].format(max_questions=st.session_state.max_questions, question_list=get_random_questions(st.session_state.selected_scenario, st.session_state.selected_level, st.session_state.max_questions))
+    selection_key = (scenario, level, num_questions)
+    if st.session_state.get("question_selection_key") != selection_key:
+        learner_id = st.session_state.learner_id
+        questions = question_bank.sample(
+            scenario, level, num_questions,
+            asked=storage.asked_questions(learner_id, scenario, level),
+            weights=topic_weights(storage.topic_scores(learner_id, scenario)),
+        )
+        st.session_state.question_selection = questions
+        st.session_state.question_selection_key = selection_key
+        # Indexes of the selection already recorded as asked, and the scores of the current one
+        st.session_state.questions_marked_asked = set()
+        st.session_state.question_attempt_scores = []
+    return st.session_state.question_selection
+
+# Function to record the question at `index` of the selection as asked, once. The interviewer asks
+# the selected questions in order and current_question points at the one being asked.
+def mark_question_asked(index):
+    questions = st.session_state.get("question_selection", [])
+    if index < len(questions) and index not in st.session_state.questions_marked_asked:
+        storage.record_questions_asked(st.session_state.learner_id, [questions[index]])
+        st.session_state.questions_marked_asked.add(index)
+
+# Function to record the mean score of the answers given to the question at `index` once the
+# interview moves past it; the weak-topic weighting learns from these
+def record_question_score(index):
+    questions = st.session_state.get("question_selection", [])
+    attempt_scores = st.session_state.question_attempt_scores
+    if index < len(questions) and attempt_scores:
+        storage.record_question_scores(st.session_state.learner_id, [(questions[index], sum(attempt_scores) / len(attempt_scores))])
+    st.session_state.question_attempt_scores = []
+
+# Function to build the system prompt, only when the template or the question selection changes,
+# so the prompt prefix stays byte-identical across turns for provider-side prompt caching
+def get_system_prompt(scenario, level, num_questions):
+    questions = get_random_questions(scenario, level, num_questions)
+    prompt_key = (scenario, level, num_questions, tuple(question.id for question in questions))
+    if st.session_state.get("system_prompt_key") != prompt_key:
+        st.session_state.system_prompt = scenarios[scenario][level].format(max_questions=num_questions, question_list=format_question_list(questions))
+        st.session_state.system_prompt_key = prompt_key
+    return st.session_state.system_prompt
+
+traces = st.session_state.traces
+# The recorder hands back its last clip on every rerun; only a clip not seen before starts a turn
+new_recording = bool(audio_bytes) and audio_fingerprint(audio_bytes) != st.session_state.get("last_recording")
+if new_recording:
+    st.session_state.last_recording = audio_fingerprint(audio_bytes)
+turn_start = time.perf_counter() if new_recording else None
+
+# Function to synthesize one reply sentence; runs on the speech pipeline's worker threads
+def traced_text_to_speech(text):
+    with span("text_to_speech", session=traces):
+        return text_to_speech(text)
+
+# Questions are drawn for the learner's stored level, the same level the prompt is written for
+system_prompt = get_system_prompt(st.session_state.selected_scenario, st.session_state.level_progress[selected_scenario], st.session_state.max_questions)
 
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.write(message["content"])
 
-if audio_bytes:
-    # Write the audio bytes to a file
+if new_recording:
+    # The recorded bytes are uploaded from memory, no temp file
     with st.spinner("Transcribing..."):
-        webm_file_path = "temp_audio.mp3"
-        with open(webm_file_path, "wb") as f:
-            f.write(audio_bytes)
-
-        transcript = speech_to_text(webm_file_path)
+        with span("speech_to_text", session=traces):
+            transcript = speech_to_text(audio_bytes, cache_scope=transcript_scope())
         if transcript:
             st.session_state.messages.append({"role": "user", "content": transcript})
             if st.session_state.introduction_given:
                 st.session_state.answers.append(transcript)  # Store the user's answer
+                st.session_state.answer_pending = True
             else:
                 st.session_state.user_introduction = transcript  # Save the user's introduction
                 st.session_state.introduction_given = True
             with st.chat_message("user"):
                 st.write(transcript)
-            os.remove(webm_file_path)
 
 if st.session_state.messages[-1]["role"] != "assistant" and st.session_state.introduction_given:
+    mark_question_asked(st.session_state.current_question)
     with st.chat_message("assistant"):
-        with st.spinner("Thinking🤔..."):
-            final_response = get_answer(st.session_state.messages, system_prompt)
-        with st.spinner("Generating audio response..."):
-            audio_file = text_to_speech(final_response)
-            autoplay_audio(audio_file)
-        st.write(final_response)
+        if STREAMING_RESPONSES:
+            response_placeholder = st.empty()
+            final_response = ""
+            with st.spinner("Thinking🤔..."), span("respond", session=traces):
+                respond_start = time.perf_counter()
+                with span("prepare_context", session=traces):
+                    context_messages = st.session_state.context_window.prepare(st.session_state.messages, system_prompt)
+                tokens = stream_answer(context_messages, system_prompt)
+                first_audio = True
+                for sentence, sentence_audio in speak_sentences(split_sentences(tokens), traced_text_to_speech):
+                    if sentence_audio:
+                        if first_audio:
+                            record("time_to_first_audio", time.perf_counter() - respond_start, session=traces)
+                            first_audio = False
+                        with span("autoplay_audio", session=traces):
+                            enqueue_audio_segment(sentence_audio)
+                    final_response += sentence
+                    response_placeholder.write(final_response)
+        else:
+            with st.spinner("Thinking🤔..."):
+                with span("prepare_context", session=traces):
+                    context_messages = st.session_state.context_window.prepare(st.session_state.messages, system_prompt)
+                with span("get_answer", session=traces):
+                    final_response = get_answer(context_messages, system_prompt)
+            with st.spinner("Generating audio response..."), span("text_to_speech", session=traces):
+                autoplay_audio_stream(stream_speech(final_response))
+            st.write(final_response)
         st.session_state.messages.append({"role": "assistant", "content": final_response})
-        os.remove(audio_file)
 
 # Evaluation function
 def evaluate_answers(user_answers):
-    scores = []
+    graded_answers = []
+    expected_answers = []
     for user_answer, assistant_msg in zip(user_answers, st.session_state.messages):
         if assistant_msg["role"] == "assistant":
-            expected_answer = assistant_msg["content"]
-            score = semantic_similarity(user_answer, expected_answer)
-            scores.append(score)
-    return scores
+            graded_answers.append(user_answer)
+            expected_answers.append(assistant_msg["content"])
+    # One encode per side and a single vectorized cosine over the whole transcript
+    result = batch_semantic_similarity(get_similarity_store(), graded_answers, expected_answers)
+    st.session_state.last_evaluation_timing = result["timing"]
+    return result["scores"]
 
 # Handle answer function
 def handle_answer(user_answer):
@@ -247,24 +360,35 @@ def handle_answer(user_answer):
 
 # Function to calculate semantic similarity
 def semantic_similarity(user_answer, expected_answer):
-    embeddings1 = model.encode(user_answer, convert_to_tensor=True)
-    embeddings2 = model.encode(expected_answer, convert_to_tensor=True)
+    store = get_similarity_store()
+    # Both sides stay in memory: the expected answer is a generated assistant message, not a fixed reference
+    embeddings1 = store.encode_one(user_answer, persist=False)
+    embeddings2 = store.encode_one(expected_answer, persist=False)
     cosine_scores = util.pytorch_cos_sim(embeddings1, embeddings2)
     return cosine_scores.item()
 
+# Function to move the interview on to the next selected question
+def advance_question():
+    record_question_score(st.session_state.current_question)
+    st.session_state.current_question += 1
+    mark_question_asked(st.session_state.current_question)
+
 def process_answer():
     user_answer = st.session_state.answers[-1]
     result, score = handle_answer(user_answer)
+    if result != "not an answer":
+        # Scored against the question being asked, i.e. the selection's current_question
+        st.session_state.question_attempt_scores.append(score)
     if result == "correct":
         st.write(f"Correct! (Score: {score:.2f}) Moving to the next question.")
-        st.session_state.current_question += 1
+        advance_question()
     elif result == "incorrect":
         st.write(f"That's not quite right. (Score: {score:.2f}) Let's try again.")
     elif result == "explain briefly":
         st.write(f"That's not quite right. Here's a brief explanation: {st.session_state.messages[-1]['content']}")
     elif result == "explain and move on":
         st.write(f"That's not quite right. Here's a detailed explanation: {st.session_state.messages[-1]['content']}")
-        st.session_state.current_question += 1
+        advance_question()
         st.session_state.incorrect_attempts = 0
     elif result == "not an answer":
         st.write("Please provide a relevant answer.")
@@ -283,6 +407,7 @@ def evaluate_session():
         next_level = unlock_next_level(st.session_state.level_progress[selected_scenario])
         if next_level:
             st.session_state.level_progress[selected_scenario] = next_level
+            storage.set_level(st.session_state.learner_id, selected_scenario, next_level)
             st.session_state.selected_level = next_level
             st.session_state.messages = [
                 {"role": "assistant", "content": f"Interview complete. You are moving to the {next_level} level."},
@@ -297,6 +422,7 @@ def evaluate_session():
     else:
         st.write("You did not pass. Please try again from the beginner level.")
         st.session_state.level_progress[selected_scenario] = "Beginner"
+        storage.set_level(st.session_state.learner_id, selected_scenario, "Beginner")
         st.session_state.selected_level = "Beginner"
         st.session_state.messages = [{"role": "assistant", "content": content[selected_scenario]["Beginner"]}]
         st.session_state.answers = []
@@ -304,9 +430,42 @@ def evaluate_session():
         st.session_state.current_question = 0
         st.session_state.introduction_given = False
         st.session_state.user_introduction = ""
-
-if st.session_state.introduction_given and len(st.session_state.answers) > 0:
-    process_answer()
+        # The retry may reuse the same selection; its questions are asked (and recorded) again
+        st.session_state.questions_marked_asked = set()
+        st.session_state.question_attempt_scores = []
+
+# Each answer is processed (and scored) once, on the turn it was given
+if st.session_state.introduction_given and len(st.session_state.answers) > 0 and st.session_state.get("answer_pending"):
+    st.session_state.answer_pending = False
+    with span("process_answer", session=traces):
+        process_answer()
+
+# Only reruns that processed a new recording count as a turn
+if turn_start is not None:
+    record("turn", time.perf_counter() - turn_start, session=traces)
+
+# Function to format stage histograms as a table in milliseconds
+def latency_rows(histograms):
+    rows = []
+    for stage, summary in histograms.summary().items():
+        row = {"stage": stage, "count": summary["count"]}
+        for key in ("p50", "p95", "p99", "max"):
+            row[f"{key} ms"] = round(summary[key] * 1000, 1) if summary[key] is not None else None
+        rows.append(row)
+    return rows
+
+# Optional debug panel: open the app with ?debug=1 or set CAS_DEBUG_PANEL=1
+if os.getenv("CAS_DEBUG_PANEL") == "1" or st.query_params.get("debug") == "1":
+    with st.expander("Latency debug panel"):
+        st.write("This session")
+        st.dataframe(latency_rows(traces))
+        st.write("All sessions of this server process")
+        st.dataframe(latency_rows(process_histograms))
+        st.write("Context window", st.session_state.context_window.stats())
+        st.write("TTS cache", tts_cache.stats())
+        st.write("Audio preprocessing", preprocess_stats())
+        st.write("Transcript cache", transcript_cache.stats())
+        st.write("Loaded resources", resource_stats())
 
 # Float the footer container and provide CSS to target it with
 footer_container.float("bottom: 0rem;")
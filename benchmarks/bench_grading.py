@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import warnings
+
+# Headless throughput benchmark of the Paths grading core (utilities/grading.py) on synthetic
+# short and long answers and multi-answer lists. Results can be saved as a baseline and later
+# runs compared against it, failing when a case got slower than the tolerance allows:
+#   python benchmarks/bench_grading.py --save .benchmarks/grading.json
+#   python benchmarks/bench_grading.py --compare .benchmarks/grading.json --tolerance 0.2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings("ignore", message="Using slow pure-python SequenceMatcher")
+
+from fuzzywuzzy import fuzz  # noqa: E402
+from utilities.grading import normalize_text, contains_phrase, highlight_errors, normalize_answers, grade_response  # noqa: E402
+
+WORDS = ("the object class method interface inheritance polymorphism constructor variable function "
+         "value list string number returns because when every instance of a an is are it can").split()
+
+
+def sentence(rng, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + rng.choice([".", "?", "!", ","])
+
+
+# Answer close to `expected`: a few words swapped, case and punctuation changed
+def misspoken(rng, expected, changes):
+    words = expected.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words).lower().rstrip(".?!,")
+
+
+def make_cases(seed=0):
+    rng = random.Random(seed)
+    short_expected = sentence(rng, 6)
+    long_expected = sentence(rng, 80)
+    answer_list = [sentence(rng, 6) for _ in range(10)]
+    short_answer = misspoken(rng, short_expected, 1)
+    long_answer = misspoken(rng, long_expected, 8)
+    list_answer = misspoken(rng, answer_list[-1], 1)
+    return {
+        "normalize_text/short": lambda: normalize_text(short_answer),
+        "normalize_text/long": lambda: normalize_text(long_answer),
+        "normalize_answers/list10": lambda: normalize_answers(answer_list),
+        "contains_phrase/short": lambda: contains_phrase(short_answer, "polymorphism"),
+        "contains_phrase/long": lambda: contains_phrase(long_answer, "polymorphism"),
+        "fuzz_ratio/short": lambda: fuzz.ratio(short_answer, short_expected),
+        "fuzz_ratio/long": lambda: fuzz.ratio(long_answer, long_expected),
+        "highlight_errors/short": lambda: highlight_errors(short_answer, short_expected),
+        "highlight_errors/long": lambda: highlight_errors(long_answer, long_expected),
+        "grade_exact/short": lambda: grade_response(short_answer, short_expected),
+        "grade_exact/long": lambda: grade_response(long_answer, long_expected),
+        "grade_exact/list10": lambda: grade_response(list_answer, answer_list),
+        "grade_contains/short": lambda: grade_response(short_answer, short_expected, type_check='contains'),
+        "grade_contains/list10": lambda: grade_response(list_answer, answer_list, type_check='contains'),
+        "grade_partial/long": lambda: grade_response(long_answer, long_expected, check_partial=True),
+    }
+
+
+# Best-of-`repeat` seconds per call, each repeat running long enough to time reliably
+def measure(fn, repeat, min_seconds):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_seconds / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Paths grading functions")
+    parser.add_argument("--filter", help="Only run cases whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="Minimum duration of each timed repeat")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a case counts as a regression")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    regressions = []
+    print(f"{'case':<26} {'us/call':>10} {'calls/s':>12} {'vs baseline':>12}")
+    for name, fn in make_cases().items():
+        if args.filter and args.filter not in name:
+            continue
+        seconds = measure(fn, args.repeat, args.min_seconds)
+        results[name] = seconds
+        change = ""
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            change = f"{(ratio - 1) * 100:+.1f}%"
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:<26} {seconds * 1e6:>10.2f} {1 / seconds:>12,.0f} {change:>12}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"python": sys.version.split()[0], "results": results}, file, indent=2)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
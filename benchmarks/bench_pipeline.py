@@ -0,0 +1,155 @@
+import argparse
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+# Offline benchmark of the interview turn (CAS.py) and voice quiz step (pages/Paths.py) pipelines
+# against fake_provider_server.py. Talks to the provider layer directly so the TTS cache and
+# Streamlit are out of the picture; every call is a real HTTP round trip to the fake server.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PROVIDER_BACKEND", "local")
+
+from utilities import providers  # noqa: E402
+from utilities.concurrency import map_in_order  # noqa: E402
+from utilities.speech_pipeline import split_sentences, speak_sentences  # noqa: E402
+
+SYSTEM_PROMPT = "You are an experienced interviewer conducting a beginner level Java programming interview session with the user."
+QUIZ_QUESTIONS = ["What is the capital of France?", "What is 2 + 2?", "What is a constructor in Java?", "What is an interface in Java?"]
+
+
+def make_wav(seconds, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def synthesize(text):
+    return b"".join(providers.stream_speech(text, "tts-1", "nova", 4096))
+
+
+def interview_turn_serial(learner, turn, clip):
+    start = time.perf_counter()
+    transcript = providers.speech_to_text((f"answer-{learner}-{turn}.wav", clip))
+    reply = providers.get_answer([{"role": "user", "content": transcript}], SYSTEM_PROMPT)
+    synthesize(reply)
+    total = time.perf_counter() - start
+    return {"first_audio": total, "total": total}
+
+
+def interview_turn_streaming(learner, turn, clip):
+    start = time.perf_counter()
+    transcript = providers.speech_to_text((f"answer-{learner}-{turn}.wav", clip))
+    first_audio = None
+    tokens = providers.stream_answer([{"role": "user", "content": transcript}], SYSTEM_PROMPT)
+    for _, audio in speak_sentences(split_sentences(tokens), synthesize):
+        if audio and first_audio is None:
+            first_audio = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return {"first_audio": first_audio or total, "total": total}
+
+
+def voice_quiz_serial(learner, turn, clip):
+    start = time.perf_counter()
+    for question in QUIZ_QUESTIONS:
+        synthesize(f"{question} ({learner}-{turn})")
+    total = time.perf_counter() - start
+    return {"first_audio": total, "total": total}
+
+
+def voice_quiz_parallel(learner, turn, clip):
+    start = time.perf_counter()
+    map_in_order(synthesize, [f"{question} ({learner}-{turn})" for question in QUIZ_QUESTIONS])
+    total = time.perf_counter() - start
+    return {"first_audio": total, "total": total}
+
+
+SCENARIOS = {
+    "interview_serial": interview_turn_serial,
+    "interview_streaming": interview_turn_streaming,
+    "voice_quiz_serial": voice_quiz_serial,
+    "voice_quiz_parallel": voice_quiz_parallel,
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_scenario(scenario, learners, turns, clip):
+    results = []
+    errors = 0
+    lock = threading.Lock()
+
+    def learner_session(learner):
+        nonlocal errors
+        for turn in range(turns):
+            try:
+                result = SCENARIOS[scenario](learner, turn, clip)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                results.append(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=learners) as executor:
+        list(executor.map(learner_session, range(learners)))
+    elapsed = time.perf_counter() - start
+    return results, errors, elapsed
+
+
+def start_local_server(port):
+    import logging
+    from werkzeug.serving import make_server
+    import fake_provider_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", port, fake_provider_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CAS/Paths provider pipelines against the fake provider server")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Scenario(s) to run (default: all)")
+    parser.add_argument("--learners", type=int, default=4, help="Concurrent learners")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per learner")
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--no-spawn", action="store_true", help="Use an already running fake_provider_server.py at LOCAL_PROVIDER_URL")
+    args = parser.parse_args()
+
+    if providers.PROVIDER_BACKEND != "local":
+        sys.exit("Refusing to benchmark against the paid APIs; set PROVIDER_BACKEND=local")
+    if not args.no_spawn:
+        start_local_server(int(providers.LOCAL_PROVIDER_URL.rsplit(":", 1)[1]))
+
+    clip = make_wav(args.clip_seconds)
+    print(f"{'scenario':<22} {'turns':>5} {'err':>4} {'turns/s':>8} {'first p50':>10} {'first p95':>10} {'total p50':>10} {'total p95':>10} {'total p99':>10}")
+    for scenario in args.scenario or list(SCENARIOS):
+        results, errors, elapsed = run_scenario(scenario, args.learners, args.turns, clip)
+        if not results:
+            print(f"{scenario:<22} {0:>5} {errors:>4}")
+            continue
+        first = [r["first_audio"] for r in results]
+        total = [r["total"] for r in results]
+        print(f"{scenario:<22} {len(results):>5} {errors:>4} {len(results) / elapsed:>8.2f} "
+              f"{statistics.median(first):>10.3f} {percentile(first, 95):>10.3f} "
+              f"{statistics.median(total):>10.3f} {percentile(total, 95):>10.3f} {percentile(total, 99):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+# Latency and word error rate of the speech-to-text backends (utilities/stt_backends.py) on a
+# fixture set: a directory of WAV clips, each with a .txt file holding its reference transcript.
+#   python benchmarks/bench_stt.py --make-fixtures fixtures/stt     (needs OPENAI_API_KEY)
+#   STT_BACKEND=auto python benchmarks/bench_stt.py fixtures/stt --backend remote --backend local --backend auto
+# Clips go through the same preprocessing as in the app; transcripts are not cached.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utilities import stt_backends  # noqa: E402
+from utilities.audio_preprocess import preprocess_audio  # noqa: E402
+from utilities.grading import normalize_text  # noqa: E402
+
+# Short, constrained answers like the ones in the voice quiz, video and read-aloud steps
+FIXTURE_TEXTS = [
+    "Paris",
+    "Four",
+    "A constructor initializes a new object.",
+    "An interface defines methods a class must implement.",
+    "Man, it's so hard to shop for girls.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Polymorphism lets one interface have many implementations.",
+    "I would use a pivot table to summarize the sales data by region.",
+    "Good morning, how are you today?",
+    "Inheritance lets a class reuse the fields and methods of another class.",
+]
+
+
+def word_errors(reference, hypothesis):
+    ref, hyp = normalize_text(reference).split(), normalize_text(hypothesis).split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        if not os.path.exists(reference_path):
+            continue
+        with open(path, "rb") as audio, open(reference_path, "r", encoding="utf-8") as reference:
+            fixtures.append((os.path.basename(path), audio.read(), reference.read().strip()))
+    return fixtures
+
+
+def make_fixtures(directory, voices=("nova", "alloy")):
+    from openai import OpenAI
+
+    client = OpenAI()
+    os.makedirs(directory, exist_ok=True)
+    for voice in voices:
+        for n, text in enumerate(FIXTURE_TEXTS):
+            name = os.path.join(directory, f"{voice}-{n:02d}")
+            audio = client.audio.speech.create(model="tts-1", voice=voice, input=text, response_format="wav")
+            with open(f"{name}.wav", "wb") as file:
+                file.write(audio.content)
+            with open(f"{name}.txt", "w", encoding="utf-8") as file:
+                file.write(text)
+    print(f"Wrote {len(voices) * len(FIXTURE_TEXTS)} fixtures to {directory}")
+
+
+def run_backend(backend, fixtures, rounds):
+    latencies, errors, words, failures = [], 0, 0, 0
+    routed = {}
+    for _ in range(rounds):
+        for name, audio, reference in fixtures:
+            upload, _ = preprocess_audio(audio)
+            route = stt_backends.choose_backend(upload, short_answer=True, backend=backend)
+            routed[route] = routed.get(route, 0) + 1
+            start = time.perf_counter()
+            try:
+                hypothesis = stt_backends.transcribe(upload, "answer.wav", short_answer=True, backend=backend)
+            except Exception as e:
+                failures += 1
+                print(f"{backend}: {name} failed: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+            clip_errors, clip_words = word_errors(reference, hypothesis)
+            errors += clip_errors
+            words += clip_words
+    return latencies, errors / words if words else None, failures, routed
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare speech-to-text backends on latency and WER")
+    parser.add_argument("fixtures", nargs="?", help="Directory of <name>.wav + <name>.txt pairs")
+    parser.add_argument("--backend", action="append", choices=stt_backends.BACKENDS, help="Backend(s) to run (default: remote and local)")
+    parser.add_argument("--rounds", type=int, default=1, help="Passes over the fixture set")
+    parser.add_argument("--make-fixtures", metavar="DIR", help="Synthesize a fixture set with the OpenAI TTS API and exit")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--ready-timeout", type=float, default=300, help="Seconds to wait for the local workers to load their models")
+    args = parser.parse_args()
+
+    if args.make_fixtures:
+        make_fixtures(args.make_fixtures)
+        return
+    if not args.fixtures:
+        parser.error("a fixture directory is required (or --make-fixtures DIR)")
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No <name>.wav + <name>.txt fixtures in {args.fixtures}")
+
+    results = {}
+    for backend in args.backend or ["remote", "local"]:
+        if backend in ("local", "auto") and not stt_backends.wait_until_ready(args.ready_timeout):
+            print(f"{backend}: no local worker ready after {args.ready_timeout}s, clips go to the remote backend")
+        latencies, wer, failures, routed = run_backend(backend, fixtures, args.rounds)
+        results[backend] = {
+            "clips": len(latencies),
+            "failures": failures,
+            "routed": routed,
+            "wer": wer,
+            "mean_seconds": statistics.mean(latencies) if latencies else None,
+            "p50_seconds": percentile(latencies, 50) if latencies else None,
+            "p95_seconds": percentile(latencies, 95) if latencies else None,
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'backend':<8} {'clips':>5} {'fail':>4} {'WER':>7} {'mean s':>8} {'p50 s':>8} {'p95 s':>8}  routed")
+    for backend, result in results.items():
+        if not result["clips"]:
+            print(f"{backend:<8} {0:>5} {result['failures']:>4}")
+            continue
+        print(f"{backend:<8} {result['clips']:>5} {result['failures']:>4} {result['wer']:>7.1%} {result['mean_seconds']:>8.3f} "
+              f"{result['p50_seconds']:>8.3f} {result['p95_seconds']:>8.3f}  {result['routed']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# Load test of the submission webhook: starts webhook_server.py (Flask dev server) and/or
+# webhook_asgi.py (uvicorn, several workers) against a throwaway database and reports
+# requests/sec and latency percentiles for each, so the two serving modes can be compared.
+#   python benchmarks/loadtest_webhook.py --requests 5000 --concurrency 64 --workers 4
+#   python benchmarks/loadtest_webhook.py --url http://127.0.0.1:5000   (an already running server)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def start_server(server, port, workers, directory):
+    env = dict(os.environ, PYTHONPATH=ROOT, WEBHOOK_PORT=str(port), CAS_DB_PATH=os.path.join(directory, "cas_learning.db"),
+               SUBMISSION_LOG_DIR=os.path.join(directory, "submissions"))
+    if server == "flask":
+        command = [sys.executable, os.path.join(ROOT, "webhook_server.py")]
+    else:
+        command = [sys.executable, os.path.join(ROOT, "webhook_asgi.py"), "--host", "127.0.0.1", "--workers", str(workers)]
+    # Run from the scratch directory so the servers create their files there, not in the repo
+    return subprocess.Popen(command, cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{url}/webhook/stats", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Webhook server at {url} did not start")
+
+
+async def run_load(url, total, concurrency):
+    latencies = []
+    statuses = {}
+    counter = iter(range(total))
+
+    async def worker(client):
+        for n in counter:
+            submission = {"user_id": f"learner-{n % 200}", "step_id": n % 12, "answer": "It is a blueprint for objects.", "n": n}
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/webhook", json=submission)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def report(label, latencies, statuses, elapsed):
+    ms = [latency * 1000 for latency in latencies]
+    codes = " ".join(f"{code}:{count}" for code, count in sorted(statuses.items(), key=str))
+    print(f"{label:<16} {len(latencies):>8} {len(latencies) / elapsed:>9.1f} {percentile(ms, 50):>9.2f} "
+          f"{percentile(ms, 95):>9.2f} {percentile(ms, 99):>9.2f} {max(ms):>9.2f}  {codes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the submission webhook")
+    parser.add_argument("--server", action="append", choices=["flask", "asgi"], help="Server(s) to start and test (default: both)")
+    parser.add_argument("--url", help="Test an already running server instead of starting one")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes for the asgi server")
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    print(f"{'server':<16} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  status")
+    if args.url:
+        report("external", *asyncio.run(run_load(args.url.rstrip("/"), args.requests, args.concurrency)))
+        return
+
+    for server in args.server or ["flask", "asgi"]:
+        url = f"http://127.0.0.1:{args.port}"
+        with tempfile.TemporaryDirectory() as directory:
+            process = start_server(server, args.port, args.workers, directory)
+            try:
+                wait_until_ready(url)
+                label = server if server == "flask" else f"asgi x{args.workers}"
+                report(label, *asyncio.run(run_load(url, args.requests, args.concurrency)))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+from flask import Flask, request, jsonify, Response
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+
+# Local stand-in for the Groq chat, Whisper transcription and TTS endpoints, for offline load tests
+# and benchmarks. Point the app at it with PROVIDER_BACKEND=local (see utilities/providers.py).
+#
+# Latency of each endpoint is drawn from a configurable distribution, e.g.
+#   FAKE_CHAT_LATENCY="lognormal:0.6,0.35"  (median ~0.6 s)
+#   FAKE_TTS_LATENCY="uniform:0.2,0.5"
+#   FAKE_STT_LATENCY="fixed:0.4"
+# and each endpoint fails with HTTP 503 at FAKE_<ENDPOINT>_FAILURE_RATE. Draws are seeded from
+# FAKE_SEED, the request body and how often that body was seen, so a run replays identically while
+# a retried request still gets a fresh draw.
+
+app = Flask(__name__)
+
+ENDPOINTS = ("chat", "stt", "tts")
+DEFAULT_LATENCY = {"chat": "lognormal:0.6,0.35", "stt": "lognormal:0.5,0.3", "tts": "lognormal:0.35,0.3"}
+
+config = {
+    "seed": os.getenv("FAKE_SEED", "0"),
+    # Delay between streamed chat tokens
+    "token_interval": float(os.getenv("FAKE_TOKEN_INTERVAL", 0.02)),
+    "latency": {name: os.getenv(f"FAKE_{name.upper()}_LATENCY", DEFAULT_LATENCY[name]) for name in ENDPOINTS},
+    "failure_rate": {name: float(os.getenv(f"FAKE_{name.upper()}_FAILURE_RATE", 0)) for name in ENDPOINTS},
+}
+
+CANNED_REPLIES = [
+    "That's a good start. Can you explain how it works in a real project?",
+    "Nice answer! Polymorphism lets one interface have many implementations. What is method overriding?",
+    "Not quite. Think about how objects of a subclass can be used where the parent type is expected. Could you try again?",
+    "Great, let's move on. What is the difference between an interface and an abstract class?",
+]
+
+# A silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, 417 bytes, ~26 ms of audio)
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)
+MP3_FRAMES_PER_CHAR = 2.5  # roughly 15 spoken characters per second
+
+
+def parse_distribution(spec):
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",")] if params else []
+    if kind not in ("fixed", "uniform", "normal", "lognormal"):
+        raise ValueError(f"Unknown latency distribution '{spec}'")
+    return kind, values
+
+
+def draw_latency(rng, spec):
+    kind, values = parse_distribution(spec)
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return max(0.0, rng.gauss(values[0], values[1]))
+    # lognormal:median,sigma
+    return rng.lognormvariate(math.log(values[0]), values[1])
+
+
+_attempts = {}
+_attempts_lock = threading.Lock()
+
+
+def request_rng(endpoint, body):
+    key = f"{endpoint}:{hashlib.sha256(body).hexdigest()}"
+    with _attempts_lock:
+        attempt = _attempts[key] = _attempts.get(key, 0) + 1
+    return random.Random(f"{config['seed']}:{key}:{attempt}")
+
+
+# Sleep for the drawn latency; return an error response if this request is chosen to fail
+def simulate(endpoint, body):
+    rng = request_rng(endpoint, body)
+    time.sleep(draw_latency(rng, config["latency"][endpoint]))
+    if rng.random() < config["failure_rate"][endpoint]:
+        return jsonify({"error": {"message": f"Simulated {endpoint} failure", "type": "server_error"}}), 503
+    return None
+
+
+def chat_reply(messages):
+    last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    index = int(hashlib.sha256(last_user.encode("utf-8")).hexdigest(), 16) % len(CANNED_REPLIES)
+    return CANNED_REPLIES[index]
+
+
+def chat_chunk(model, delta, finish_reason=None):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+@app.route('/openai/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    failure = simulate("chat", request.get_data())
+    if failure:
+        return failure
+    body = request.json
+    model = body.get("model", "fake")
+    reply = chat_reply(body.get("messages", []))
+
+    if not body.get("stream"):
+        return jsonify({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(reply.split()), "total_tokens": len(reply.split())},
+        })
+
+    def stream():
+        yield f"data: {json.dumps(chat_chunk(model, {'role': 'assistant', 'content': ''}))}\n\n"
+        for word in reply.split(" "):
+            time.sleep(config["token_interval"])
+            yield f"data: {json.dumps(chat_chunk(model, {'content': word + ' '}))}\n\n"
+        yield f"data: {json.dumps(chat_chunk(model, {}, 'stop'))}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Response(stream(), mimetype="text/event-stream")
+
+
+@app.route('/v1/audio/transcriptions', methods=['POST'])
+def transcriptions():
+    audio = request.files.get("file")
+    audio_bytes = audio.read() if audio else b""
+    failure = simulate("stt", audio_bytes)
+    if failure:
+        return failure
+    transcript = f"this is a fake transcript of {len(audio_bytes)} bytes of audio"
+    if request.form.get("response_format", "json") == "text":
+        return Response(transcript, mimetype="text/plain")
+    return jsonify({"text": transcript})
+
+
+@app.route('/v1/audio/speech', methods=['POST'])
+def speech():
+    failure = simulate("tts", request.get_data())
+    if failure:
+        return failure
+    text = request.json.get("input", "")
+    frames = max(1, int(len(text) * MP3_FRAMES_PER_CHAR))
+
+    def stream():
+        # Send the clip in ~4 KB pieces like the real endpoint does
+        for start in range(0, frames, 10):
+            yield MP3_FRAME * min(10, frames - start)
+
+    return Response(stream(), mimetype="audio/mpeg")
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Groq/OpenAI provider server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--seed", default=config["seed"])
+    parser.add_argument("--token-interval", type=float, default=config["token_interval"])
+    for name in ENDPOINTS:
+        parser.add_argument(f"--{name}-latency", default=config["latency"][name])
+        parser.add_argument(f"--{name}-failure-rate", type=float, default=config["failure_rate"][name])
+    args = parser.parse_args()
+
+    config["seed"] = args.seed
+    config["token_interval"] = args.token_interval
+    for name in ENDPOINTS:
+        parse_distribution(getattr(args, f"{name}_latency"))
+        config["latency"][name] = getattr(args, f"{name}_latency")
+        config["failure_rate"][name] = getattr(args, f"{name}_failure_rate")
+
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
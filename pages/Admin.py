@@ -1,48 +1,30 @@
 import streamlit as st
-import json
-import os
-
-# Load the submission data from JSON file
-def load_questions():
-    if os.path.exists('questions.json'):
-        with open('questions.json', 'r', encoding='utf-8') as file:
-            try:
-                return json.load(file)
-            except json.JSONDecodeError:
-                return {"questions": []}
-    return {"questions": []}
-
-# Save questions to JSON file
-def save_questions(questions):
-    with open('questions.json', 'w', encoding='utf-8') as file:
-        json.dump(questions, file, ensure_ascii=False, indent=4)
+from utilities.path_repository import get_path_repository
+
+# Steps are addressed by their stable id; each action is a one or two row write
+repository = get_path_repository()
 
 # Function to add a new question
 def add_question(question):
-    questions = load_questions()
-    question['id'] = len(questions['questions']) + 1
-    questions['questions'].append(question)
-    save_questions(questions)
+    return repository.add(question)
 
 # Function to delete a question by ID
 def delete_question(question_id):
-    questions = load_questions()
-    questions['questions'] = [q for q in questions['questions'] if q['id'] != question_id]
-    save_questions(questions)
+    repository.delete(question_id)
+
+# Function to delete several questions in one commit
+def delete_questions(question_ids):
+    with repository.batch() as edits:
+        for question_id in question_ids:
+            edits.delete(question_id)
 
 # Function to move a question up in the sequence
-def move_question_up(index):
-    questions = load_questions()
-    if index > 0:
-        questions['questions'][index], questions['questions'][index - 1] = questions['questions'][index - 1], questions['questions'][index]
-        save_questions(questions)
+def move_question_up(question_id):
+    repository.move(question_id, -1)
 
 # Function to move a question down in the sequence
-def move_question_down(index):
-    questions = load_questions()
-    if index < len(questions['questions']) - 1:
-        questions['questions'][index], questions['questions'][index + 1] = questions['questions'][index + 1], questions['questions'][index]
-        save_questions(questions)
+def move_question_down(question_id):
+    repository.move(question_id, 1)
 
 # Admin Page
 st.title("Admin Page")
@@ -176,21 +158,30 @@ elif question_type == "pictureDescription":
 
 # Display Current Sequence
 st.header("Current Sequence")
-questions = load_questions()["questions"]
+questions = repository.list_steps()
+
+selected_ids = st.multiselect(
+    "Select questions to delete",
+    [question['id'] for question in questions],
+    format_func=lambda question_id: f"#{question_id}",
+)
+if selected_ids and st.button("Delete selected"):
+    delete_questions(selected_ids)
+    st.experimental_rerun()
 
 for index, question in enumerate(questions):
     st.write(f"{index + 1}. {question['type']} - {question.get('content', 'N/A')}")
     st.write(question.get('phrases', question.get('words', question.get('sentences', 'N/A'))))
     st.write(question.get('questions', 'N/A'))
     
-    if st.button(f"Delete {index + 1}"):
+    if st.button(f"Delete {index + 1}", key=f"delete_{question['id']}"):
         delete_question(question['id'])
         st.experimental_rerun()
     
-    if st.button(f"Move Up {index + 1}"):
-        move_question_up(index)
+    if st.button(f"Move Up {index + 1}", key=f"move_up_{question['id']}"):
+        move_question_up(question['id'])
         st.experimental_rerun()
     
-    if st.button(f"Move Down {index + 1}"):
-        move_question_down(index)
+    if st.button(f"Move Down {index + 1}", key=f"move_down_{question['id']}"):
+        move_question_down(question['id'])
         st.experimental_rerun()
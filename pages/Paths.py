@@ -1,148 +1,79 @@
-import streamlit as st
-import json
 import os
-import tempfile
-import string
+import time
+import streamlit as st
 from datetime import datetime, timedelta
-from fuzzywuzzy import fuzz
 from dotenv import load_dotenv
 from audio_recorder_streamlit import audio_recorder
-from utils import speech_to_text, text_to_speech, get_answer, autoplay_audio
-import difflib
+from utils import speech_to_text, text_to_speech, get_answer, autoplay_audio, transcript_scope
+from utilities.concurrency import map_in_order
+from utilities.curriculum_cache import get_curriculum
+from utilities.context_window import ContextWindow
+from utilities.grading import grade_response, highlight_errors
+from utilities.live_speech import live_speech_available, live_speech_input
+from utilities.reply_prefetch import ReplyPrefetcher
+from utilities.tracing import record
+from utilities import stt_backends
 
 # Load environment variables
 load_dotenv()
 
-# Load the question data from JSON files
-def load_json(file_path):
-    if os.path.exists(file_path):
-        with open(file_path, encoding='utf-8') as file:
-            return json.load(file)
-    return {"questions": []}
-
-question_data = load_json('questions.json')
-
-# Helper function to normalize text by removing punctuation and extra whitespace
-def normalize_text(text):
-    if not text or not isinstance(text, str):
-        return ""
-    translator = str.maketrans('', '', string.punctuation)
-    normalized = ' '.join(text.lower().translate(translator).split())
-    return normalized
-
-# Function to check if a phrase is contained within the response
-def contains_phrase(response, phrase):
-    return phrase.lower() in response.lower()
-
-# Function to highlight errors in the response
-def highlight_errors(user_response, correct_answer):
-    matcher = difflib.SequenceMatcher(None, user_response, correct_answer)
-    highlighted_user_response = []
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            highlighted_user_response.append(user_response[i1:i2])
-        elif tag == 'replace' or tag == 'delete':
-            highlighted_user_response.append(f"<span style='color: red; text-decoration: underline;'>{user_response[i1:i2]}</span>")
-        elif tag == 'insert':
-            highlighted_user_response.append(f"<span style='color: red; text-decoration: underline;'>{correct_answer[j1:j2]}</span>")
-    return ''.join(highlighted_user_response)
-
-# Function to handle audio response
-def handle_audio_response(prompt, correct_answer, key, check_partial=False, type_check='exact'):
-    audio_data = audio_recorder(f"Record your response:", key=key, pause_threshold=2.5, icon_size="2x")
-    if audio_data:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as audio_file:
-            audio_file.write(audio_data)
-            audio_file_path = audio_file.name
+# Start the local speech-to-text workers early when STT_BACKEND is local or auto
+stt_backends.warm_up()
 
-        transcription = speech_to_text(audio_file_path)
-        normalized_transcription = normalize_text(transcription)
+# botTalk steps listen with live browser transcription instead of the recorder when BOT_TALK_LIVE=1
+# (or the step sets "live": true) and streamlit_bokeh_events is installed; see utilities/live_speech.py
+BOT_TALK_LIVE = os.getenv("BOT_TALK_LIVE") == "1"
 
-        if isinstance(correct_answer, list):
-            normalized_correct_answers = [normalize_text(answer) for answer in correct_answer]
-        else:
-            normalized_correct_answers = [normalize_text(correct_answer)]
+BOT_TALK_SYSTEM_PROMPT = "Continue the conversation based on the user's input. Make it interactive, but stick to only one question at a time. Don't give the user multiple questions to answer or they'll get flustered. Lastly, you can ask about something specific that they answered (not always though). Most importantly, keep your response short and concise, maximum two sentences."
 
-        if type_check == 'contains':
-            if any(contains_phrase(normalized_transcription, answer) for answer in normalized_correct_answers):
-                st.write(f"You Said: {transcription}")
-                st.success("Correct answer!")
-                st.session_state[f"audio_correct_{key}"] = True
-            else:
-                highlighted_user_response = highlight_errors(transcription, correct_answer)
-                st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
-                st.error(f"Incorrect answer, please try again.")
-                st.session_state[f"audio_correct_{key}"] = False
-        else:
-            similarity_scores = [fuzz.ratio(normalized_transcription, answer) for answer in normalized_correct_answers]
-            percentage_correct = max(similarity_scores)
-
-            if check_partial:
-                if any(contains_phrase(normalized_transcription, answer) for answer in normalized_correct_answers):
-                    st.write(f"You Said: {transcription}")
-                    st.success("Correct answer!")
-                    st.session_state[f"audio_correct_{key}"] = True
-                else:
-                    highlighted_user_response = highlight_errors(transcription, correct_answer)
-                    st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
-                    st.error(f"Incorrect answer, please try again.")
-                    st.session_state[f"audio_correct_{key}"] = False
-            else:
-                if percentage_correct >= 90:
-                    st.write(f"You Said: {transcription}")
-                    st.success("Correct answer!")
-                    st.session_state[f"audio_correct_{key}"] = True
-                else:
-                    highlighted_user_response = highlight_errors(transcription, correct_answer)
-                    st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
-                    st.error(f"Incorrect answer, please try again.")
-                    st.session_state[f"audio_correct_{key}"] = False
+# Function to transcribe a recorded response; the recorder's bytes are uploaded from memory
+def transcribe_audio_response(audio_data, cache_scope=None, short_answer=False):
+    return speech_to_text(audio_data, cache_scope=cache_scope, short_answer=short_answer)
+
+# Function to render the recorder for a question now and grade it later with resolve_audio_responses,
+# so the transcriptions of all questions in a step can run in parallel
+def defer_audio_response(prompt, correct_answer, key, check_partial=False, type_check='exact'):
+    audio_data = audio_recorder(f"Record your response:", key=key, pause_threshold=2.5, icon_size="2x")
+    return {
+        "audio_data": audio_data,
+        "result_container": st.container(),
+        "correct_answer": correct_answer,
+        "key": key,
+        "check_partial": check_partial,
+        "type_check": type_check,
+    }
+
+# Function to transcribe every recorded response of a step in parallel and grade each in place.
+# Used by the video, read-aloud and voice quiz steps, whose short answers may be transcribed locally.
+def resolve_audio_responses(pending_responses):
+    recorded = [response for response in pending_responses if response["audio_data"]]
+    cache_scope = transcript_scope()
+    transcriptions = map_in_order(lambda audio_data: transcribe_audio_response(audio_data, cache_scope, short_answer=True), [response["audio_data"] for response in recorded])
+    for response, transcription in zip(recorded, transcriptions):
+        with response["result_container"]:
+            grade_audio_response(transcription, response["correct_answer"], response["key"], response["check_partial"], response["type_check"])
+
+# Function to show the grading result of a response and record it in the session state
+def show_grading_result(response, correct_answer, state_key, check_partial=False, type_check='exact'):
+    if grade_response(response, correct_answer, check_partial, type_check):
+        st.write(f"You Said: {response}")
+        st.success("Correct answer!")
+        st.session_state[state_key] = True
+    else:
+        highlighted_user_response = highlight_errors(response, correct_answer)
+        st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
+        st.error(f"Incorrect answer, please try again.")
+        st.session_state[state_key] = False
+
+# Function to grade a transcribed audio response
+def grade_audio_response(transcription, correct_answer, key, check_partial=False, type_check='exact'):
+    show_grading_result(transcription, correct_answer, f"audio_correct_{key}", check_partial, type_check)
 
 # Function to handle text response
 def handle_text_response(prompt, correct_answer, key, check_partial=False, type_check='exact'):
     user_response = st.text_input("Your answer", key=key)
     if st.button("Submit", key=f"submit_{key}"):
-        normalized_user_response = normalize_text(user_response)
-
-        if isinstance(correct_answer, list):
-            normalized_correct_answers = [normalize_text(answer) for answer in correct_answer]
-        else:
-            normalized_correct_answers = [normalize_text(correct_answer)]
-
-        if type_check == 'contains':
-            if any(contains_phrase(normalized_user_response, answer) for answer in normalized_correct_answers):
-                st.write(f"You Said: {user_response}")
-                st.success("Correct answer!")
-                st.session_state[f"text_correct_{key}"] = True
-            else:
-                highlighted_user_response = highlight_errors(user_response, correct_answer)
-                st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
-                st.error(f"Incorrect answer, please try again.")
-                st.session_state[f"text_correct_{key}"] = False
-        else:
-            similarity_scores = [fuzz.ratio(normalized_user_response, answer) for answer in normalized_correct_answers]
-            percentage_correct = max(similarity_scores)
-
-            if check_partial:
-                if any(contains_phrase(normalized_user_response, answer) for answer in normalized_correct_answers):
-                    st.write(f"You Said: {user_response}")
-                    st.success("Correct answer!")
-                    st.session_state[f"text_correct_{key}"] = True
-                else:
-                    highlighted_user_response = highlight_errors(user_response, correct_answer)
-                    st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
-                    st.error(f"Incorrect answer, please try again.")
-                    st.session_state[f"text_correct_{key}"] = False
-            else:
-                if percentage_correct >= 90:
-                    st.write(f"You Said: {user_response}")
-                    st.success("Correct answer!")
-                    st.session_state[f"text_correct_{key}"] = True
-                else:
-                    highlighted_user_response = highlight_errors(user_response, correct_answer)
-                    st.markdown(f"Errors: {highlighted_user_response}", unsafe_allow_html=True)
-                    st.error(f"Incorrect answer, please try again.")
-                    st.session_state[f"text_correct_{key}"] = False
+        show_grading_result(user_response, correct_answer, f"text_correct_{key}", check_partial, type_check)
 
 # Bot Talk Template
 def bot_talk_template(data, question_number):
@@ -171,8 +102,8 @@ def bot_talk_template(data, question_number):
         st.session_state.bot_convo_state["conversation_history"].append({"role": "assistant", "content": question})
 
     st.write(f"🤖 Bot: {question}")
-    audio_response_path = text_to_speech(question)
-    autoplay_audio(audio_response_path)
+    audio_response = text_to_speech(question)
+    autoplay_audio(audio_response)
 
     if "timer_start" not in st.session_state or "timer_duration" not in st.session_state:
         st.session_state.timer_start = datetime.now()
@@ -190,8 +121,8 @@ def bot_talk_template(data, question_number):
             st.write(f"🧑 You: {message['content']}")
         elif message['role'] == 'assistant' and message['content'] != data['phrases']:
             st.write(f"🤖 Bot: {message['content']}")
-            audio_response_path = text_to_speech(message['content'])
-            autoplay_audio(audio_response_path)
+            audio_response = text_to_speech(message['content'])
+            autoplay_audio(audio_response)
 
     # Check if time is up
     if time_remaining.total_seconds() <= 0:
@@ -204,58 +135,126 @@ def bot_talk_template(data, question_number):
         st.error("Time's up! Please try again.")
         return
 
+    # Listen live: the reply is prefetched while the learner is still talking
+    if use_live_speech(data) and handle_live_speech(data, question_number):
+        return
+
     # Record audio response
     audio_data = audio_recorder(f"Record your response:", key=f"bot_convo_audio_{data['id']}_{question_number}_{st.session_state.bot_convo_state['key_counter']}", pause_threshold=2.5, icon_size="2x")
 
     # Process the recorded audio response
     if audio_data:
         st.session_state.bot_convo_state['status'] = "listening..."
-        st.session_state.bot_convo_state['key_counter'] += 1
         process_bot_audio_response(audio_data, data, question_number, additional_info)
 
 def process_bot_audio_response(audio_data, data, question_number, additional_info):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as audio_file:
-        audio_file.write(audio_data)
-        audio_file_path = audio_file.name
-
-    transcription = speech_to_text(audio_file_path)
-    st.session_state.bot_convo_state['conversation_history'].append({"role": "user", "content": transcription})
+    transcription = speech_to_text(audio_data, cache_scope=transcript_scope())
     st.session_state.bot_convo_state['status'] = "analyzing..."
-
-    system_prompt = f"Continue the conversation based on the user's input. Make it interactive, but stick to only one question at a time. Don't give the user multiple questions to answer or they'll get flustered. Lastly, you can ask about something specific that they answered (not always though). Most importantly, keep your response short and concise, maximum two sentences."
-    assistant_response = get_answer(st.session_state.bot_convo_state['conversation_history'], system_prompt)
-    # Text-to-Speech for bot response
-    audio_response_path = text_to_speech(assistant_response)
-    autoplay_audio(audio_response_path)
+    assistant_response, audio_response = prepare_bot_reply(transcription)()
+    finish_bot_turn(transcription, assistant_response, audio_response)
+
+# Function to prepare the bot's reply to a user message. The context is built here, on the script
+# thread; the returned call (LLM reply and its speech) may run on a worker thread.
+def prepare_bot_reply(transcription):
+    conversation_history = st.session_state.bot_convo_state['conversation_history'] + [{"role": "user", "content": transcription}]
+    # Only the recent turns and a summary of the older ones are sent
+    context_window = st.session_state.bot_convo_state.setdefault('context_window', ContextWindow())
+    context_messages = context_window.prepare(conversation_history, BOT_TALK_SYSTEM_PROMPT)
+
+    def generate():
+        assistant_response = get_answer(context_messages, BOT_TALK_SYSTEM_PROMPT)
+        # Text-to-Speech for bot response
+        return assistant_response, text_to_speech(assistant_response)
+    return generate
+
+# Function to add a finished turn to the conversation and play the bot's reply. The input widget's
+# key only moves on here, so a turn whose reply failed can be retried with the same recording.
+def finish_bot_turn(transcription, assistant_response, audio_response):
+    st.session_state.bot_convo_state['key_counter'] += 1
+    st.session_state.bot_convo_state['conversation_history'].append({"role": "user", "content": transcription})
+    autoplay_audio(audio_response)
     st.session_state.bot_convo_state['conversation_history'].append({"role": "assistant", "content": assistant_response})
 
     st.session_state.bot_convo_state['status'] = "waiting for you to speak (click the button)"
     st.experimental_rerun()
 
+# Function to check whether a botTalk step listens with live transcription
+def use_live_speech(data):
+    return (BOT_TALK_LIVE or data.get('live', False)) and st.session_state.bot_convo_state.get('live', True) and live_speech_available()
+
+# Function to handle a live transcribed turn. Every partial transcript reruns the page; a pause
+# prefetches the reply to what was said so far, and the end of the turn uses it if nothing changed.
+# Returns False when the browser can't transcribe, so the recorder is shown instead.
+def handle_live_speech(data, question_number):
+    convo_state = st.session_state.bot_convo_state
+    prefetcher = convo_state.setdefault('prefetcher', ReplyPrefetcher())
+    turn = f"{data['id']}_{question_number}_{convo_state['key_counter']}"
+    event = live_speech_input(turn, label="Speak", key_prefix="bot_convo_speech")
+
+    # The component repeats its last event on every rerun; handle each one once
+    if event and convo_state.get('live_event') != (turn, event['seq']):
+        convo_state['live_event'] = (turn, event['seq'])
+        if event['kind'] == "unsupported":
+            convo_state['live'] = False
+            st.warning("Live transcription isn't supported by this browser, please record your response instead.")
+            return False
+        convo_state['live_partial'] = event['text']
+        if event['kind'] == "pause":
+            prefetcher.prefetch(event['text'], prepare_bot_reply)
+        elif event['kind'] == "final":
+            if not event['text']:
+                # Nothing was said: start a fresh turn without this one's prefetches
+                prefetcher.reset()
+                convo_state['key_counter'] += 1
+                st.experimental_rerun()
+            convo_state['status'] = "analyzing..."
+            turn_start = time.perf_counter()
+            try:
+                (assistant_response, audio_response), prefetched = prefetcher.take(event['text'], prepare_bot_reply)
+            except Exception as e:
+                # Keep the learner's words; the next rerun tries this turn's reply again
+                convo_state['live_event'] = None
+                st.error(f"Couldn't get the bot's reply ({e}).")
+                st.button("Retry", key=f"bot_convo_retry_{turn}")
+            else:
+                record("bot_talk_reply_wait", time.perf_counter() - turn_start, prefetched=prefetched)
+                convo_state['live_partial'] = ""
+                finish_bot_turn(event['text'], assistant_response, audio_response)
+
+    if convo_state.get('live_partial'):
+        st.write(f"🧑 You: {convo_state['live_partial']} …")
+    return True
+
 # Template functions
 def video_template(data, question_number):
     st.write(f"Question {question_number}: Video")
     st.video(data['content'])
+    pending_audio = []
     for i, question in enumerate(data['questions']):
         st.write(question['question'])
-        handle_audio_response(question['question'], question['correct_answer'], key=f"video_audio_{data['id']}_{i}", type_check='exact')
+        pending_audio.append(defer_audio_response(question['question'], question['correct_answer'], key=f"video_audio_{data['id']}_{i}", type_check='exact'))
         handle_text_response(question['question'], question['correct_answer'], key=f"video_text_{data['id']}_{i}", type_check='exact')
+    resolve_audio_responses(pending_audio)
 
 def speak_out_loud_template(data, question_number):
     st.write(f"Question {question_number}: Speak Out Loud")
+    pending_audio = []
     for i, sentence in enumerate(data['sentences']):
         st.write(sentence)
-        handle_audio_response(sentence, sentence, key=f"speakOutLoud_audio_{data['id']}_{i}", type_check='exact')
+        pending_audio.append(defer_audio_response(sentence, sentence, key=f"speakOutLoud_audio_{data['id']}_{i}", type_check='exact'))
         handle_text_response(sentence, sentence, key=f"speakOutLoud_text_{data['id']}_{i}", type_check='exact')
+    resolve_audio_responses(pending_audio)
 
 def voice_quiz_template(data, question_number):
     st.write(f"Question {question_number}: Voice Quiz")
+    # TTS for all the questions of the step at once
+    question_audio = map_in_order(text_to_speech, [question['question'] for question in data['questions']])
+    pending_audio = []
     for i, question in enumerate(data['questions']):
         st.markdown(f'{question["question"]}', unsafe_allow_html=True, help=question.get("hint",""))
-        # TTS for the initial question
-        audio_response_path = text_to_speech(question['question'])
-        st.audio(audio_response_path, format="audio/mp3", start_time=0)
-        handle_audio_response(question['question'], question['correct_answer'], key=f"voiceQuiz_audio_{data['id']}_{i}", type_check='contains')
+        st.audio(question_audio[i], format="audio/mp3", start_time=0)
+        pending_audio.append(defer_audio_response(question['question'], question['correct_answer'], key=f"voiceQuiz_audio_{data['id']}_{i}", type_check='contains'))
+    resolve_audio_responses(pending_audio)
 
 def text_quiz_template(data, question_number):
     st.write(f"Question {question_number}: Text Quiz")
@@ -280,11 +279,7 @@ def picture_quiz_template(data, question_number):
     st.markdown(f'{question["question"]}', unsafe_allow_html=True, help=question.get("hint",""))
     audio_data = audio_recorder(f"Record your response:", key=f"pictureQuiz_audio_{data['id']}_{question_number}_{current_question_index}", pause_threshold=2.5, icon_size="2x")
     if audio_data:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as audio_file:
-            audio_file.write(audio_data)
-            audio_file_path = audio_file.name
-
-        transcription = speech_to_text(audio_file_path)
+        transcription = speech_to_text(audio_data, cache_scope=transcript_scope())
         st.write(f"You Said: {transcription}")
         
         answer = question.get("hint", "")
@@ -306,40 +301,32 @@ def picture_quiz_template(data, question_number):
 def picture_description_template(data, question_number):
     st.write(f"Question {question_number}: Picture Description")
     st.image(data['image_url'])
+    question_audio = map_in_order(text_to_speech, [question["question"] for question in data['questions']])
     for i, question in enumerate(data['questions']):
         st.markdown(f'{question["question"]}', unsafe_allow_html=True)
-        audio_response_path = text_to_speech(question["question"])
-        autoplay_audio(audio_response_path)
+        autoplay_audio(question_audio[i])
     
     # First audio response
     audio_data_1 = audio_recorder(f"Record your response:", key=f"picture_desc_audio_1_{question_number}", pause_threshold=2.5, icon_size="2x")
     if audio_data_1:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as audio_file:
-            audio_file.write(audio_data_1)
-            audio_file_path = audio_file.name
-
-        transcription_1 = speech_to_text(audio_file_path)
+        transcription_1 = speech_to_text(audio_data_1, cache_scope=transcript_scope())
         st.write(f"You Said: {transcription_1}")
         st.markdown("Bot")
         middle_response = "Could you elaborate more on this"
         st.markdown(middle_response)
-        audio_response_path = text_to_speech(middle_response)
-        autoplay_audio(audio_response_path)
+        audio_response = text_to_speech(middle_response)
+        autoplay_audio(audio_response)
 
         # Second audio response
         audio_data_2 = audio_recorder(f"Record your response:", key=f"picture_desc_audio_2_{question_number}", pause_threshold=2.5, icon_size="2x")
         if audio_data_2:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as audio_file:
-                audio_file.write(audio_data_2)
-                audio_file_path = audio_file.name
-
-            transcription_2 = speech_to_text(audio_file_path)
+            transcription_2 = speech_to_text(audio_data_2, cache_scope=transcript_scope())
             st.write(f"You Said: {transcription_2}")
             st.markdown("Bot")
             final_response = "Thank you. You can move onto the next."
             st.markdown(final_response)
-            audio_response_path = text_to_speech(final_response)
-            autoplay_audio(audio_response_path)
+            audio_response = text_to_speech(final_response)
+            autoplay_audio(audio_response)
 
 # Initialize session state
 def initialize_session_state():
@@ -373,11 +360,13 @@ def render_step(step, question_number):
 
 st.title("Interactive Learning Path")
 
-steps = question_data['questions']
+# Shared, read-only copy of the path; only re-read after an Admin edit
+curriculum = get_curriculum()
+step_count = len(curriculum.steps)
 current_step_index = st.session_state.current_step
 
-if current_step_index < len(steps):
-    step = steps[current_step_index]
+if current_step_index < step_count:
+    step = curriculum.steps[current_step_index]
     question_number = current_step_index + 1
     render_step(step, question_number)
 
@@ -406,7 +395,7 @@ with col1:
 
 with col2:
     if st.button("Next"):
-        if st.session_state.current_step < len(steps) - 1:
+        if st.session_state.current_step < step_count - 1:
             next_step()
             st.experimental_rerun()
 
@@ -0,0 +1,129 @@
+import io
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+# Local clean-up of recorded answers before they are uploaded for transcription. The recorder
+# hands over uncompressed WAV, often stereo at 44.1/48 kHz, that still contains the silence before
+# the learner starts talking and the whole pause_threshold pause after they stop. Whisper
+# resamples everything to 16 kHz mono anyway, so converting and trimming here only removes bytes
+# (and upload time), not information. Anything that isn't 16-bit PCM WAV is passed through as is.
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1") == "1"
+AUDIO_TARGET_RATE = int(os.getenv("AUDIO_TARGET_RATE", 16000))
+# Silence kept around the detected speech so word onsets and endings aren't clipped
+AUDIO_VAD_PADDING = float(os.getenv("AUDIO_VAD_PADDING", 0.3))
+# Frames at or below this RMS are clearly silent. Only runs of them at the edges are trimmed, and
+# the noise floor is estimated from them alone, so a clip that is mostly speech keeps all of it.
+AUDIO_VAD_SILENCE_RMS = float(os.getenv("AUDIO_VAD_SILENCE_RMS", 100))
+# The clip has speech when a frame's RMS is this many times the noise floor (and above the minimum)
+AUDIO_VAD_RATIO = float(os.getenv("AUDIO_VAD_RATIO", 3.0))
+AUDIO_VAD_MIN_RMS = float(os.getenv("AUDIO_VAD_MIN_RMS", 300))
+VAD_FRAME_SECONDS = 0.03
+
+_totals = {"clips": 0, "processed": 0, "input_bytes": 0, "output_bytes": 0, "trimmed_seconds": 0.0, "seconds": 0.0}
+_totals_lock = threading.Lock()
+
+
+def _read_wav(audio):
+    try:
+        with wave.open(io.BytesIO(audio), "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getcomptype() != "NONE":
+                return None
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32)
+    return samples.reshape(-1, channels), rate
+
+
+def _write_wav(samples, rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def to_mono(samples):
+    return samples.mean(axis=1)
+
+
+def resample(samples, rate, target_rate):
+    if target_rate >= rate or not len(samples):
+        return samples, rate
+    ratio = rate / target_rate
+    # Box low-pass over one output period before picking samples, so high frequencies don't alias
+    width = int(np.ceil(ratio))
+    if width > 1:
+        samples = np.convolve(samples, np.full(width, 1 / width, dtype=np.float32), mode="same")
+    positions = np.arange(0, len(samples) - 1, ratio)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32), target_rate
+
+
+# (start, end) sample range without the clearly silent frames at either edge, plus padding; None if
+# the clip has no speech
+def speech_bounds(samples, rate, padding=AUDIO_VAD_PADDING):
+    frame = max(1, int(rate * VAD_FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return None
+    rms = np.sqrt(np.mean(samples[:count * frame].reshape(count, frame) ** 2, axis=1))
+    silent = rms <= AUDIO_VAD_SILENCE_RMS
+    noise_floor = np.median(rms[silent]) if silent.any() else 0.0
+    voiced = np.flatnonzero(rms > max(noise_floor * AUDIO_VAD_RATIO, AUDIO_VAD_MIN_RMS))
+    if not len(voiced):
+        return None
+    # Keep every frame that isn't clearly silent, even quiet speech the threshold above misses
+    kept = np.flatnonzero(~silent)
+    first, last = min(voiced[0], kept[0]), max(voiced[-1], kept[-1])
+    pad = int(padding * rate)
+    return max(0, first * frame - pad), min(len(samples), (last + 1) * frame + pad)
+
+
+# Return (audio, report): the clip as 16-bit mono WAV at AUDIO_TARGET_RATE with edge silence removed
+def preprocess_audio(audio, target_rate=AUDIO_TARGET_RATE):
+    start = time.perf_counter()
+    report = {"processed": False, "input_bytes": len(audio), "output_bytes": len(audio), "bytes_saved": 0}
+    decoded = _read_wav(audio) if AUDIO_PREPROCESS else None
+    if decoded is not None and len(decoded[0]):
+        samples, rate = decoded
+        mono, new_rate = resample(to_mono(samples), rate, target_rate)
+        input_seconds = len(samples) / rate
+        bounds = speech_bounds(mono, new_rate)
+        # No speech found: send the whole clip and let the transcriber decide
+        if bounds is not None:
+            mono = mono[bounds[0]:bounds[1]]
+        output = _write_wav(mono, new_rate)
+        if len(output) < len(audio):
+            audio = output
+            report.update({
+                "processed": True,
+                "output_bytes": len(output),
+                "bytes_saved": report["input_bytes"] - len(output),
+                "input_seconds": round(input_seconds, 3),
+                "output_seconds": round(len(mono) / new_rate, 3),
+                "input_format": f"{samples.shape[1]}ch {rate} Hz",
+            })
+    report["seconds"] = time.perf_counter() - start
+    with _totals_lock:
+        _totals["clips"] += 1
+        _totals["processed"] += report["processed"]
+        _totals["input_bytes"] += report["input_bytes"]
+        _totals["output_bytes"] += report["output_bytes"]
+        _totals["trimmed_seconds"] += report.get("input_seconds", 0) - report.get("output_seconds", 0)
+        _totals["seconds"] += report["seconds"]
+    return audio, report
+
+
+def preprocess_stats():
+    with _totals_lock:
+        stats = dict(_totals)
+    stats["bytes_saved"] = stats["input_bytes"] - stats["output_bytes"]
+    stats["saved_ratio"] = stats["bytes_saved"] / stats["input_bytes"] if stats["input_bytes"] else 0.0
+    return stats
@@ -0,0 +1,44 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Upper bound on provider calls (STT, TTS, LLM) in flight at once across all sessions of this process
+PROVIDER_WORKERS = int(os.getenv("PROVIDER_WORKERS", 8))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PROVIDER_WORKERS, thread_name_prefix="provider")
+        return _executor
+
+
+# Run independent calls on the shared bounded executor and return their results in submission order.
+# Every call is allowed to finish before the first error (if any) is re-raised.
+# The calls must not use Streamlit APIs (there is no script context on worker threads) and must not
+# call gather themselves, which could starve the pool.
+def gather(calls):
+    calls = list(calls)
+    if len(calls) == 1:
+        return [calls[0]()]
+    futures = [get_executor().submit(call) for call in calls]
+    results = []
+    error = None
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(None)
+            error = error or e
+    if error is not None:
+        raise error
+    return results
+
+
+def map_in_order(fn, items):
+    return gather(partial(fn, item) for item in items)
@@ -0,0 +1,117 @@
+import os
+import time
+
+from utilities import providers
+
+# Bounds what each chat turn sends to the LLM. The last CONTEXT_KEEP_MESSAGES messages go out
+# verbatim; older ones are folded into a rolling summary that is updated incrementally (previous
+# summary + the newly folded messages), never rebuilt from the whole transcript. Folding happens
+# in batches of CONTEXT_FOLD_BATCH messages so the summary call runs every few turns, not every
+# turn, and CONTEXT_TOKEN_BUDGET caps the estimated size of system prompt + summary + window.
+CONTEXT_KEEP_MESSAGES = int(os.getenv("CONTEXT_KEEP_MESSAGES", 8))
+CONTEXT_FOLD_BATCH = int(os.getenv("CONTEXT_FOLD_BATCH", 4))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", 400))
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a learner and an AI tutor/interviewer. "
+    "Update the summary with the new messages. Keep the questions asked, how the learner answered, "
+    "hints already given and anything the learner said about themselves. Reply with the summary only, "
+    "in at most {max_words} words."
+)
+
+
+# Rough token count (about 4 characters per token plus per-message overhead); only used for budgeting
+def estimate_tokens(text):
+    return len(text) // 4 + 4
+
+
+def _transcript(messages):
+    return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+
+
+# Default summarizer: one short chat completion through the shared provider layer
+def summarize_with_llm(summary, messages):
+    prompt = f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{_transcript(messages)}"
+    system_prompt = SUMMARY_PROMPT.format(max_words=int(CONTEXT_SUMMARY_MAX_TOKENS * 0.75))
+    return providers.get_answer([{"role": "user", "content": prompt}], system_prompt)
+
+
+class ContextWindow:
+    """
+    Per-conversation context state; keep one in ``st.session_state`` next to the message list.
+
+    ``prepare(messages, system_prompt)`` returns the messages to send instead of the full list.
+    If the conversation is reset (the list is replaced or shrinks), the summary starts over.
+    """
+
+    def __init__(self, keep_messages=CONTEXT_KEEP_MESSAGES, fold_batch=CONTEXT_FOLD_BATCH,
+                 token_budget=CONTEXT_TOKEN_BUDGET, summarize=summarize_with_llm):
+        self.keep_messages = max(1, keep_messages)
+        self.fold_batch = max(1, fold_batch)
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.summary = ""
+        self.summarized_upto = 0
+        self._last_folded = None
+        self.folds = 0
+        self.summary_seconds = 0.0
+        self.last_tokens = 0
+
+    def _reset_if_replaced(self, messages):
+        if self.summarized_upto and (
+            len(messages) < self.summarized_upto
+            or messages[self.summarized_upto - 1]["content"] != self._last_folded
+        ):
+            self.summary = ""
+            self.summarized_upto = 0
+            self._last_folded = None
+
+    # Fold messages[summarized_upto:end] into the summary
+    def _fold(self, messages, end):
+        folded = messages[self.summarized_upto:end]
+        if not folded:
+            return
+        start = time.perf_counter()
+        try:
+            summary = self.summarize(self.summary, folded)
+        except Exception:
+            # Keep the conversation going without the summarizer; the budget check below clips this
+            summary = f"{self.summary}\n{_transcript(folded)}".strip()
+        self.summary_seconds += time.perf_counter() - start
+        max_chars = CONTEXT_SUMMARY_MAX_TOKENS * 4
+        self.summary = summary if len(summary) <= max_chars else summary[-max_chars:]
+        self.summarized_upto = end
+        self._last_folded = messages[end - 1]["content"]
+        self.folds += 1
+
+    def _window(self, messages):
+        window = list(messages[self.summarized_upto:])
+        if self.summary:
+            window.insert(0, {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        return window
+
+    def _tokens(self, window, system_prompt):
+        return estimate_tokens(system_prompt) + sum(estimate_tokens(message["content"]) for message in window)
+
+    def prepare(self, messages, system_prompt):
+        self._reset_if_replaced(messages)
+        if len(messages) - self.summarized_upto >= self.keep_messages + self.fold_batch:
+            self._fold(messages, len(messages) - self.keep_messages)
+        window = self._window(messages)
+        # Over budget: fold half of the remaining window at a time, always sending the latest message
+        while self._tokens(window, system_prompt) > self.token_budget and len(messages) - self.summarized_upto > 1:
+            unsummarized = len(messages) - self.summarized_upto
+            self._fold(messages, len(messages) - max(1, unsummarized // 2))
+            window = self._window(messages)
+        self.last_tokens = self._tokens(window, system_prompt)
+        return window
+
+    def stats(self):
+        return {
+            "summarized_messages": self.summarized_upto,
+            "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+            "folds": self.folds,
+            "summary_seconds": round(self.summary_seconds, 3),
+            "estimated_prompt_tokens": self.last_tokens,
+        }
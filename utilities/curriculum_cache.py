@@ -0,0 +1,62 @@
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from utilities.path_repository import get_path_repository
+
+# Process-wide copy of the learning path shared by every learner's Paths session. A rerun only
+# checks the path version (one point read of the meta table); the steps are re-read and decoded
+# once per Admin commit, in whichever process made it.
+
+Curriculum = namedtuple("Curriculum", ["version", "steps", "by_id"])
+
+
+# Read-only view of a decoded step: dicts become mappingproxies and lists become tuples,
+# so a template can't change the copy other sessions are reading
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class CurriculumCache:
+    def __init__(self, repository):
+        self.repository = repository
+        self._lock = threading.Lock()
+        self._curriculum = Curriculum(None, (), MappingProxyType({}))
+        self.loads = 0
+
+    def get(self):
+        # Read the version before the steps: if an edit lands in between, the steps are newer
+        # than the version they are stored under and the next call simply reloads them
+        version = self.repository.version()
+        curriculum = self._curriculum
+        if curriculum.version == version:
+            return curriculum
+        with self._lock:
+            if self._curriculum.version != version:
+                steps = tuple(freeze(step) for step in self.repository.list_steps())
+                self._curriculum = Curriculum(version, steps, MappingProxyType({step["id"]: step for step in steps}))
+                self.loads += 1
+            return self._curriculum
+
+    def stats(self):
+        return {"version": self._curriculum.version, "steps": len(self._curriculum.steps), "loads": self.loads}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_curriculum_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CurriculumCache(get_path_repository())
+        return _cache
+
+
+def get_curriculum():
+    return get_curriculum_cache().get()
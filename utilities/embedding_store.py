@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Embeddings of fixed reference texts (ones that repeat across sessions, like curriculum answers)
+# can be persisted here so reruns and other processes don't re-encode them. Learner answers and
+# generated text are one-off and stay in memory only, so the directory doesn't grow with usage.
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+# Upper bound on embeddings held in memory per model (all-MiniLM-L6-v2 vectors are 1.5 KB each)
+EMBEDDING_CACHE_MAX_ITEMS = int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", 20000))
+
+
+class EmbeddingStore:
+    """
+    Sentence embeddings keyed by a hash of the text.
+
+    Lookups go memory -> disk -> model; all misses of a call are encoded in
+    one batch. The in-memory layer is an LRU bounded by ``max_items``; only
+    ``encode(..., persist=True)`` writes new embeddings to disk; use it for
+    fixed references only.
+    """
+
+    def __init__(self, model, model_name, cache_dir=EMBEDDING_CACHE_DIR, max_items=EMBEDDING_CACHE_MAX_ITEMS):
+        self.model = model
+        self.model_name = model_name
+        self.cache_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> np.ndarray, least recently used first
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _remember(self, key, embedding):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                return embedding
+        try:
+            embedding = np.load(self._path_for(key))
+        except (FileNotFoundError, ValueError):
+            return None
+        with self._lock:
+            self._remember(key, embedding)
+        return embedding
+
+    def _persist(self, key, embedding):
+        path = self._path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, embedding)
+        os.replace(tmp_path, path)
+
+    # Return a (len(texts), dim) array of embeddings, encoding only the texts not seen before.
+    # persist=True also writes new embeddings to disk (use it for fixed references only).
+    def encode(self, texts, persist=False):
+        keys = [self.make_key(text) for text in texts]
+        found = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            embedding = self._lookup(key)
+            if embedding is None:
+                missing[key] = text
+            else:
+                found[key] = embedding
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            encoded = self.model.encode(list(missing.values()), convert_to_numpy=True)
+            for key, embedding in zip(missing, encoded):
+                found[key] = embedding
+                if persist:
+                    self._persist(key, embedding)
+                with self._lock:
+                    self._remember(key, embedding)
+
+        return np.stack([found[key] for key in keys])
+
+    def encode_one(self, text, persist=False):
+        return self.encode([text], persist)[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "max_items": self.max_items,
+            }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# One store per model name per process, so every rerun shares the same in-memory layer
+def get_embedding_store(model, model_name):
+    with _stores_lock:
+        store = _stores.get(model_name)
+        if store is None:
+            store = _stores[model_name] = EmbeddingStore(model, model_name)
+        else:
+            store.model = model
+        return store
@@ -0,0 +1,56 @@
+import difflib
+import string
+
+from fuzzywuzzy import fuzz
+
+# Grading of typed and spoken answers on the Paths page, kept free of Streamlit so it can be
+# benchmarked headless (benchmarks/bench_grading.py).
+
+# Minimum fuzz.ratio (0-100) against any accepted answer for an 'exact' answer to pass
+PASS_RATIO = 90
+
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+# Helper function to normalize text by removing punctuation and extra whitespace
+def normalize_text(text):
+    if not text or not isinstance(text, str):
+        return ""
+    return ' '.join(text.lower().translate(_PUNCTUATION).split())
+
+
+# Function to check if a phrase is contained within the response
+def contains_phrase(response, phrase):
+    return phrase.lower() in response.lower()
+
+
+# Function to highlight errors in the response
+def highlight_errors(user_response, correct_answer):
+    matcher = difflib.SequenceMatcher(None, user_response, correct_answer)
+    highlighted_user_response = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            highlighted_user_response.append(user_response[i1:i2])
+        elif tag == 'replace' or tag == 'delete':
+            highlighted_user_response.append(f"<span style='color: red; text-decoration: underline;'>{user_response[i1:i2]}</span>")
+        elif tag == 'insert':
+            highlighted_user_response.append(f"<span style='color: red; text-decoration: underline;'>{correct_answer[j1:j2]}</span>")
+    return ''.join(highlighted_user_response)
+
+
+# A step's correct answer is a single string or a list of accepted answers
+def normalize_answers(correct_answer):
+    if isinstance(correct_answer, (list, tuple)):
+        return [normalize_text(answer) for answer in correct_answer]
+    return [normalize_text(correct_answer)]
+
+
+# Function to decide whether a response is correct.
+# 'contains' (or check_partial) passes if any accepted answer appears in the response;
+# 'exact' passes if the response is at least PASS_RATIO similar to any accepted answer.
+def grade_response(response, correct_answer, check_partial=False, type_check='exact'):
+    normalized_response = normalize_text(response)
+    normalized_answers = normalize_answers(correct_answer)
+    if type_check == 'contains' or check_partial:
+        return any(contains_phrase(normalized_response, answer) for answer in normalized_answers)
+    return max(fuzz.ratio(normalized_response, answer) for answer in normalized_answers) >= PASS_RATIO
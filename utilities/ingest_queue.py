@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from utilities.storage import get_storage, SQLITE_INT_MIN, SQLITE_INT_MAX
+from utilities.submission_log import SubmissionLog
+
+# Webhook submissions are validated in the request handler and put on a bounded in-memory queue;
+# one background writer drains it into the submission store in batches, flushing when
+# INGEST_BATCH_SIZE items are waiting or INGEST_FLUSH_INTERVAL seconds have passed. A full queue
+# is reported to the caller so the endpoint can answer 429 instead of holding a request thread.
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 10000))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 256))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", 0.05))
+# Pause before retrying a batch after a transient store error (e.g. "database is locked"),
+# doubling up to INGEST_MAX_RETRY_DELAY
+INGEST_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY", 0.1))
+INGEST_MAX_RETRY_DELAY = float(os.getenv("INGEST_MAX_RETRY_DELAY", 5.0))
+# Submissions the store rejects outright are set aside here, one JSON line each, with the error
+INGEST_DEAD_LETTER_PATH = os.getenv("INGEST_DEAD_LETTER_PATH", "submissions.dead.jsonl")
+# Keys a submission's step id may be given under (see storage._submission_step)
+STEP_ID_KEYS = ("step_id", "question_id", "id")
+
+logger = logging.getLogger(__name__)
+# Submissions go to the shared SQLite store (indexed by learner and step) or, with
+# SUBMISSION_STORE=log, to the append-only segment log. Both are safe to write from several
+# worker processes at once.
+SUBMISSION_STORE = os.getenv("SUBMISSION_STORE", "sqlite")
+
+
+def open_submission_store(kind=SUBMISSION_STORE):
+    if kind == "log":
+        store = SubmissionLog()
+        store.import_legacy('submissions.json')
+        return store
+    return get_storage()
+
+
+# A submission must be a JSON object and numeric ids must fit a signed 64-bit integer;
+# returns an error message or None
+def validate_submission(submission):
+    if not isinstance(submission, dict):
+        return "Expected a JSON object"
+    for key in STEP_ID_KEYS:
+        value = submission.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and not SQLITE_INT_MIN <= value <= SQLITE_INT_MAX:
+            return f"'{key}' must fit in a signed 64-bit integer"
+    return None
+
+
+# Errors worth retrying the same batch for: the store is busy or briefly unavailable. Anything
+# else (OverflowError, ValueError, IntegrityError, ...) is a problem with the data itself.
+def is_transient_error(error):
+    return isinstance(error, (sqlite3.OperationalError, OSError))
+
+
+class IngestQueue:
+    def __init__(self, store, max_size=INGEST_QUEUE_SIZE, batch_size=INGEST_BATCH_SIZE,
+                 flush_interval=INGEST_FLUSH_INTERVAL, dead_letter_path=INGEST_DEAD_LETTER_PATH):
+        self.store = store
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stats_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._started_at = time.monotonic()
+        self._accepted = 0
+        self._rejected = 0
+        self._written = 0
+        self._batches = 0
+        self._write_errors = 0
+        self._dead_lettered = 0
+        self.dead_letter_path = dead_letter_path
+        # (finished_at, items, seconds) for the most recent flushes
+        self._recent_flushes = deque(maxlen=256)
+        self._writer = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._writer.start()
+
+    # Queue a submission; False when the queue is full and the caller should back off
+    def submit(self, item):
+        if self._stopping.is_set():
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            return False
+        with self._stats_lock:
+            self._accepted += 1
+        return True
+
+    def depth(self):
+        return self._queue.qsize()
+
+    # Seconds a rejected client should wait: roughly how long the writer needs to drain the backlog
+    def retry_after(self):
+        rate = self._throughput()
+        if not rate:
+            return 1
+        return max(1, min(60, int(self.depth() / rate) + 1))
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        delay = INGEST_RETRY_DELAY
+        while True:
+            start = time.perf_counter()
+            try:
+                self.store.append_many(batch)
+            except Exception as e:
+                with self._stats_lock:
+                    self._write_errors += 1
+                if not is_transient_error(e):
+                    self._split_write(batch, e)
+                    return
+                # Keep the batch rather than drop accepted submissions; the queue fills up meanwhile
+                # and new requests get 429 until the store recovers
+                if self._stopping.is_set() and delay >= INGEST_MAX_RETRY_DELAY:
+                    self._dead_letter(batch, e)
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, INGEST_MAX_RETRY_DELAY)
+                continue
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self._written += len(batch)
+                self._batches += 1
+                self._recent_flushes.append((time.monotonic(), len(batch), elapsed))
+            return
+
+    # The store rejected the batch because of its contents: write the halves separately until the
+    # bad submissions are isolated, then set those aside
+    def _split_write(self, batch, error):
+        if len(batch) == 1:
+            self._dead_letter(batch, error)
+            return
+        middle = len(batch) // 2
+        self._write(batch[:middle])
+        self._write(batch[middle:])
+
+    def _dead_letter(self, batch, error):
+        with self._stats_lock:
+            self._dead_lettered += len(batch)
+        logger.warning("Setting aside %d submission(s) the store rejected: %r", len(batch), error)
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as file:
+                for submission in batch:
+                    file.write(json.dumps({"error": repr(error), "submission": submission}, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            logger.exception("Could not write to the dead-letter file %s", self.dead_letter_path)
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    # Stop accepting, write out everything already queued and flush the store
+    def close(self, timeout=10.0):
+        self._stopping.set()
+        self._writer.join(timeout)
+        # The segment log also stops its background sync timer on close
+        close = getattr(self.store, "close", None) or self.store.flush
+        close()
+
+    # Items written per second over the last few seconds of flushes
+    def _throughput(self, window=10.0):
+        now = time.monotonic()
+        with self._stats_lock:
+            items = sum(count for finished, count, _ in self._recent_flushes if now - finished <= window)
+        span = min(window, now - self._started_at)
+        return items / span if span > 0 else 0.0
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = sorted(seconds for _, _, seconds in self._recent_flushes)
+            sizes = [count for _, count, _ in self._recent_flushes]
+            stats = {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_size,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "written": self._written,
+                "batches": self._batches,
+                "write_errors": self._write_errors,
+                "dead_lettered": self._dead_lettered,
+                "flush_latency_ms": {
+                    "last": round(self._recent_flushes[-1][2] * 1000, 3) if self._recent_flushes else None,
+                    "p50": _percentile_ms(latencies, 50),
+                    "p95": _percentile_ms(latencies, 95),
+                    "max": _percentile_ms(latencies, 100),
+                },
+                "mean_batch_size": round(sum(sizes) / len(sizes), 1) if sizes else None,
+            }
+        stats["throughput_per_second"] = round(self._throughput(), 1)
+        return stats
+
+
+def _percentile_ms(ordered, q):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return round(ordered[index] * 1000, 3)
@@ -0,0 +1,104 @@
+import os
+
+# Live transcription in the browser (Chrome's webkitSpeechRecognition with interim results),
+# delivered to Python through streamlit_bokeh_events, as tried in ppa.py. A turn starts with a
+# click on the button and produces a sequence of events, each {"turn", "seq", "kind", "text"}:
+#   partial  the words recognized so far (at most every LIVE_SPEECH_PARTIAL_MS)
+#   pause    the learner stopped talking for LIVE_SPEECH_PAUSE_MS: the text is likely complete
+#   final    no speech for LIVE_SPEECH_END_MS (or recognition ended): the turn is over
+# bokeh and streamlit_bokeh_events are optional; without them live_speech_available() is False.
+LIVE_SPEECH_PARTIAL_MS = int(os.getenv("LIVE_SPEECH_PARTIAL_MS", 700))
+LIVE_SPEECH_PAUSE_MS = int(os.getenv("LIVE_SPEECH_PAUSE_MS", 500))
+LIVE_SPEECH_END_MS = int(os.getenv("LIVE_SPEECH_END_MS", 1500))
+LIVE_SPEECH_LANGUAGE = os.getenv("LIVE_SPEECH_LANGUAGE", "en-US")
+
+EVENT_NAME = "LIVE_SPEECH"
+
+_RECOGNITION_JS = """
+const Recognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+if (!Recognition) {
+    document.dispatchEvent(new CustomEvent("%(event)s", {detail: {turn: "%(turn)s", seq: 0, kind: "unsupported", text: ""}}));
+    return;
+}
+// One recognizer per turn, even if the button is clicked again
+if (window.liveSpeechTurn === "%(turn)s") { return; }
+window.liveSpeechTurn = "%(turn)s";
+const recognition = new Recognition();
+recognition.lang = "%(language)s";
+recognition.continuous = true;
+recognition.interimResults = true;
+let seq = 0, text = "", lastSent = 0, ended = false, pauseTimer = null, endTimer = null, partialTimer = null;
+const send = function (kind) {
+    seq += 1;
+    document.dispatchEvent(new CustomEvent("%(event)s", {detail: {turn: "%(turn)s", seq: seq, kind: kind, text: text.trim()}}));
+};
+const finish = function () {
+    if (ended) { return; }
+    ended = true;
+    clearTimeout(pauseTimer); clearTimeout(endTimer); clearTimeout(partialTimer);
+    recognition.stop();
+    send("final");
+};
+recognition.onresult = function (e) {
+    let committed = "", interim = "";
+    for (let i = 0; i < e.results.length; ++i) {
+        if (e.results[i].isFinal) { committed += e.results[i][0].transcript; }
+        else { interim += e.results[i][0].transcript; }
+    }
+    text = committed + interim;
+    clearTimeout(pauseTimer); clearTimeout(endTimer);
+    pauseTimer = setTimeout(function () { send("pause"); }, %(pause_ms)d);
+    endTimer = setTimeout(finish, %(end_ms)d);
+    const wait = %(partial_ms)d - (Date.now() - lastSent);
+    clearTimeout(partialTimer);
+    partialTimer = setTimeout(function () { lastSent = Date.now(); send("partial"); }, Math.max(0, wait));
+};
+// Recognition also ends on its own after a long silence; with nothing said, let the button start over
+recognition.onend = function () {
+    if (text.trim()) { finish(); } else if (!ended) { window.liveSpeechTurn = null; }
+};
+recognition.start();
+"""
+
+_available = None
+
+
+def live_speech_available():
+    global _available
+    if _available is None:
+        try:
+            import bokeh  # noqa: F401
+            import streamlit_bokeh_events  # noqa: F401
+            _available = True
+        except ImportError:
+            _available = False
+    return _available
+
+
+# Render the talk button for one turn and return the latest event of that turn, or None.
+# `turn` must change for every turn; it is part of the component key.
+def live_speech_input(turn, label="Speak", key_prefix="live_speech"):
+    from bokeh.models import CustomJS
+    from bokeh.models.widgets import Button
+    from streamlit_bokeh_events import streamlit_bokeh_events
+
+    button = Button(label=label, width=100)
+    button.js_on_event("button_click", CustomJS(code=_RECOGNITION_JS % {
+        "event": EVENT_NAME,
+        "turn": turn,
+        "language": LIVE_SPEECH_LANGUAGE,
+        "pause_ms": LIVE_SPEECH_PAUSE_MS,
+        "end_ms": LIVE_SPEECH_END_MS,
+        "partial_ms": LIVE_SPEECH_PARTIAL_MS,
+    }))
+    result = streamlit_bokeh_events(
+        button,
+        events=EVENT_NAME,
+        key=f"{key_prefix}_{turn}",
+        refresh_on_update=False,
+        override_height=75,
+        debounce_time=0)
+    event = (result or {}).get(EVENT_NAME)
+    if not event or event.get("turn") != str(turn):
+        return None
+    return event
@@ -0,0 +1,111 @@
+import logging
+import os
+import resource
+import threading
+import time
+
+# Process-wide registry of heavy, read-only resources (models, question banks).
+# Streamlit re-executes page scripts on every interaction, but imported modules live for the
+# whole server process, so anything loaded through here is loaded once and shared by all sessions.
+
+logger = logging.getLogger(__name__)
+
+_loaders = {}
+_entries = {}
+_name_locks = {}
+_lock = threading.Lock()
+_warm_up_started = set()
+_warm_up_errors = {}
+
+
+def _current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs (e.g. macOS): fall back to peak RSS, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Register how to build a resource. The first registration for a name wins, so calling this
+# on every rerun is cheap and never replaces an already loaded resource.
+def register_resource(name, loader):
+    with _lock:
+        if name not in _loaders:
+            _loaders[name] = loader
+            _name_locks[name] = threading.Lock()
+
+
+# Return the resource, loading it on first use. Concurrent callers wait for the same load.
+def get_resource(name):
+    entry = _entries.get(name)
+    if entry is not None:
+        return entry["value"]
+    with _lock:
+        if name not in _loaders:
+            raise KeyError(f"No resource registered under '{name}'")
+        name_lock = _name_locks[name]
+    with name_lock:
+        entry = _entries.get(name)
+        if entry is None:
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            value = _loaders[name]()
+            entry = {
+                "value": value,
+                "load_seconds": time.perf_counter() - start,
+                "rss_delta_bytes": _current_rss_bytes() - rss_before,
+                "loaded_at": time.time(),
+            }
+            _entries[name] = entry
+            _warm_up_errors.pop(name, None)
+        return entry["value"]
+
+
+def is_loaded(name):
+    return name in _entries
+
+
+# Load registered resources on a background thread so the first interaction doesn't pay for them.
+# Called from a page script, this starts with the first script run of the process (the first
+# session), not at server start; later calls are no-ops.
+def warm_up(names=None):
+    with _lock:
+        pending = [name for name in (names or list(_loaders)) if name not in _warm_up_started]
+        _warm_up_started.update(pending)
+    if not pending:
+        return None
+
+    def load_all():
+        for name in pending:
+            try:
+                get_resource(name)
+            except Exception as e:
+                # Nothing is cached for a failed load: the next get_resource call loads it again
+                # (and raises to its caller if it still fails). resource_stats reports the error.
+                _warm_up_errors[name] = repr(e)
+                logger.exception("Warm-up of resource '%s' failed", name)
+
+    thread = threading.Thread(target=load_all, name="resource-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def resource_stats():
+    stats = {"process_rss_bytes": _current_rss_bytes(), "resources": {}}
+    with _lock:
+        names = list(_loaders)
+    for name in names:
+        entry = _entries.get(name)
+        if entry is None:
+            stats["resources"][name] = {"loaded": False, "warming": name in _warm_up_started and name not in _warm_up_errors}
+            if name in _warm_up_errors:
+                stats["resources"][name]["warm_up_error"] = _warm_up_errors[name]
+        else:
+            stats["resources"][name] = {
+                "loaded": True,
+                "load_seconds": entry["load_seconds"],
+                "rss_delta_bytes": entry["rss_delta_bytes"],
+                "loaded_at": entry["loaded_at"],
+            }
+    return stats
@@ -0,0 +1,201 @@
+import json
+
+from utilities.storage import PATH_ORDER_GAP, QUESTIONS_JSON, get_storage
+
+
+class PathRepository:
+    """
+    Learning path content on top of the shared SQLite store.
+
+    Steps are looked up by id through the primary key and ordered by a sparse
+    ``position`` key, so adding, deleting and moving a step touch one or two
+    rows. Ids come from a monotonic counter and are never reused after a delete,
+    which keeps the ``audio_correct_{id}_{i}`` session keys in Paths stable.
+    Several edits can be committed together with ``batch()``; every commit bumps
+    the path version that readers use to notice changes.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    @property
+    def conn(self):
+        return self.storage.conn
+
+    # --- Reads ---
+
+    def list_steps(self):
+        rows = self.conn.execute("SELECT data FROM path_steps ORDER BY position").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def step_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM path_steps").fetchone()[0]
+
+    def get(self, step_id):
+        row = self.conn.execute("SELECT data FROM path_steps WHERE id = ?", (step_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_at(self, index):
+        row = self.conn.execute("SELECT data FROM path_steps ORDER BY position LIMIT 1 OFFSET ?", (index,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def version(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'path_version'").fetchone()
+        return int(row["value"]) if row else 0
+
+    # --- Writes ---
+
+    # Group several edits into one transaction and one version bump:
+    #     with repository.batch() as edits:
+    #         edits.delete(3)
+    #         edits.move(7, -1)
+    def batch(self):
+        return _PathBatch(self.storage)
+
+    def add(self, step, index=None):
+        with self.batch() as edits:
+            return edits.add(step, index)
+
+    def update(self, step_id, fields):
+        with self.batch() as edits:
+            edits.update(step_id, fields)
+
+    def delete(self, step_id):
+        with self.batch() as edits:
+            edits.delete(step_id)
+
+    def move(self, step_id, offset):
+        with self.batch() as edits:
+            edits.move(step_id, offset)
+
+    def move_to(self, step_id, index):
+        with self.batch() as edits:
+            edits.move_to(step_id, index)
+
+    # Write the current path back out in the questions.json format
+    def export_json(self, path=QUESTIONS_JSON):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"questions": self.list_steps()}, file, ensure_ascii=False, indent=4)
+
+
+class PathEdits:
+    """Edits applied inside one ``PathRepository.batch()`` transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Start the id counter after the highest id in the path, before anything can be deleted
+    def _ensure_id_counter(self):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) "
+            "SELECT 'next_step_id', CAST(COALESCE(MAX(id), 0) + 1 AS TEXT) FROM path_steps"
+        )
+
+    def _allocate_id(self):
+        self._ensure_id_counter()
+        next_id = int(self.conn.execute("SELECT value FROM meta WHERE key = 'next_step_id'").fetchone()["value"])
+        self.conn.execute("UPDATE meta SET value = ? WHERE key = 'next_step_id'", (str(next_id + 1),))
+        return next_id
+
+    def _position_of(self, step_id):
+        row = self.conn.execute("SELECT position FROM path_steps WHERE id = ?", (step_id,)).fetchone()
+        return row["position"] if row else None
+
+    # Order key for a step placed at `index` (None = at the end), excluding `moving_id` from the path
+    def _position_for_index(self, index, moving_id=None):
+        keys = "SELECT position FROM path_steps WHERE id IS NOT ? ORDER BY position"
+        if index is None or index >= self.conn.execute("SELECT COUNT(*) FROM path_steps WHERE id IS NOT ?", (moving_id,)).fetchone()[0]:
+            last = self.conn.execute(f"{keys} DESC LIMIT 1", (moving_id,)).fetchone()
+            return (last["position"] if last else 0) + PATH_ORDER_GAP
+        index = max(0, index)
+        after = self.conn.execute(f"{keys} LIMIT 1 OFFSET ?", (moving_id, index)).fetchone()["position"]
+        before = self.conn.execute(f"{keys} LIMIT 1 OFFSET ?", (moving_id, index - 1)).fetchone() if index else None
+        before = before["position"] if before else after - 2 * PATH_ORDER_GAP
+        middle = (before + after) / 2
+        if before < middle < after:
+            return middle
+        # The gap is used up (after many inserts at the same spot): spread the keys out again
+        self._respace()
+        return self._position_for_index(index, moving_id)
+
+    def _respace(self):
+        ids = [row["id"] for row in self.conn.execute("SELECT id FROM path_steps ORDER BY position")]
+        self.conn.executemany(
+            "UPDATE path_steps SET position = ? WHERE id = ?",
+            [((n + 1) * PATH_ORDER_GAP, step_id) for n, step_id in enumerate(ids)],
+        )
+
+    def add(self, step, index=None):
+        step_id = self._allocate_id()
+        step = dict(step, id=step_id)
+        self.conn.execute(
+            "INSERT INTO path_steps (id, position, type, data) VALUES (?, ?, ?, ?)",
+            (step_id, self._position_for_index(index), step["type"], json.dumps(step, ensure_ascii=False)),
+        )
+        return step_id
+
+    def update(self, step_id, fields):
+        row = self.conn.execute("SELECT data FROM path_steps WHERE id = ?", (step_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No path step with id {step_id}")
+        step = dict(json.loads(row["data"]), **fields, id=step_id)
+        self.conn.execute(
+            "UPDATE path_steps SET type = ?, data = ? WHERE id = ?",
+            (step["type"], json.dumps(step, ensure_ascii=False), step_id),
+        )
+
+    def delete(self, step_id):
+        self._ensure_id_counter()
+        self.conn.execute("DELETE FROM path_steps WHERE id = ?", (step_id,))
+
+    # Swap a step with its neighbour (offset -1 = up, +1 = down); two indexed row updates
+    def move(self, step_id, offset):
+        position = self._position_of(step_id)
+        if position is None or offset == 0:
+            return
+        if offset < 0:
+            neighbour = self.conn.execute(
+                "SELECT id, position FROM path_steps WHERE position < ? ORDER BY position DESC LIMIT 1", (position,)
+            ).fetchone()
+        else:
+            neighbour = self.conn.execute(
+                "SELECT id, position FROM path_steps WHERE position > ? ORDER BY position LIMIT 1", (position,)
+            ).fetchone()
+        if neighbour is None:
+            return
+        self.conn.execute("UPDATE path_steps SET position = ? WHERE id = ?", (neighbour["position"], step_id))
+        self.conn.execute("UPDATE path_steps SET position = ? WHERE id = ?", (position, neighbour["id"]))
+
+    # Move a step to an arbitrary index by giving it a key between its new neighbours
+    def move_to(self, step_id, index):
+        if self._position_of(step_id) is None:
+            return
+        position = self._position_for_index(index, moving_id=step_id)
+        self.conn.execute("UPDATE path_steps SET position = ? WHERE id = ?", (position, step_id))
+
+
+class _PathBatch:
+    def __init__(self, storage):
+        self._transaction = storage.transaction()
+
+    def __enter__(self):
+        self.conn = self._transaction.__enter__()
+        return PathEdits(self.conn)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('path_version', '1') "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+        return self._transaction.__exit__(exc_type, exc, tb)
+
+
+_repository = None
+
+
+def get_path_repository():
+    global _repository
+    if _repository is None:
+        _repository = PathRepository(get_storage())
+    return _repository
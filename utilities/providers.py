@@ -0,0 +1,245 @@
+import asyncio
+import os
+import random
+import threading
+
+import groq
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# All provider traffic of the process goes through one event loop and one pooled HTTP client,
+# so connections are reused across calls, sessions and providers instead of opened per request.
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", 60))
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", 10))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", 3))
+PROVIDER_BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", 0.5))
+PROVIDER_BACKOFF_MAX = float(os.getenv("PROVIDER_BACKOFF_MAX", 8))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 64))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 32))
+# Items (tokens, audio chunks) a stream may read ahead of its synchronous consumer
+STREAM_BUFFER_ITEMS = int(os.getenv("STREAM_BUFFER_ITEMS", 64))
+# Requests in flight per provider, across all sessions of this process
+PROVIDER_CONCURRENCY = {
+    "openai": int(os.getenv("OPENAI_MAX_CONCURRENCY", 16)),
+    "groq": int(os.getenv("GROQ_MAX_CONCURRENCY", 8)),
+}
+
+# "remote" talks to the real Groq/OpenAI APIs, "local" to fake_provider_server.py for offline
+# load tests and benchmarks
+PROVIDER_BACKEND = os.getenv("PROVIDER_BACKEND", "remote")
+LOCAL_PROVIDER_URL = os.getenv("LOCAL_PROVIDER_URL", "http://127.0.0.1:5050")
+
+CHAT_MODEL = "LLaMA3-70b-8192"
+STT_MODEL = "whisper-1"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    groq.APIConnectionError,
+    httpx.TransportError,
+)
+
+
+def provider_settings():
+    if PROVIDER_BACKEND == "local":
+        return {
+            "openai": {"api_key": "local", "base_url": f"{LOCAL_PROVIDER_URL}/v1"},
+            "groq": {"api_key": "local", "base_url": LOCAL_PROVIDER_URL},
+        }
+    if PROVIDER_BACKEND != "remote":
+        raise ValueError(f"Unknown PROVIDER_BACKEND '{PROVIDER_BACKEND}', expected 'remote' or 'local'")
+    # base_url=None lets each SDK use its default (or OPENAI_BASE_URL / GROQ_BASE_URL)
+    return {
+        "openai": {"api_key": os.getenv("OPENAI_API_KEY"), "base_url": os.getenv("OPENAI_BASE_URL")},
+        "groq": {"api_key": os.getenv("GROQ_API_KEY"), "base_url": os.getenv("GROQ_BASE_URL")},
+    }
+
+
+class ProviderClients:
+    """
+    Async OpenAI and Groq clients sharing one pooled ``httpx.AsyncClient``.
+
+    The clients live on a dedicated event loop thread; synchronous code uses
+    ``run_sync`` / ``iterate_sync`` to call into it.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.http_client = None
+        self.openai = None
+        self.groq = None
+        self.semaphores = {}
+
+    def _start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="provider-loop", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            self._loop, self._thread = loop, thread
+
+    async def _setup(self):
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(PROVIDER_TIMEOUT, connect=PROVIDER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
+        # Retries are handled by with_retries so they share the jittered backoff and the concurrency limits
+        settings = provider_settings()
+        self.openai = openai.AsyncOpenAI(**settings["openai"], http_client=self.http_client, max_retries=0)
+        self.groq = groq.AsyncGroq(**settings["groq"], http_client=self.http_client, max_retries=0)
+        self.semaphores = {name: asyncio.Semaphore(limit) for name, limit in PROVIDER_CONCURRENCY.items()}
+
+    @property
+    def loop(self):
+        self._start()
+        return self._loop
+
+    # Run a coroutine on the provider loop and block until it finishes
+    def run_sync(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    # Drive an async generator on the provider loop and yield its items synchronously. At most
+    # STREAM_BUFFER_ITEMS items are buffered ahead of the consumer; if the consumer stops early
+    # (the generator is closed or garbage collected, e.g. on a Streamlit rerun) the producer is
+    # cancelled, which closes the stream and releases its concurrency slot.
+    def iterate_sync(self, agen):
+        loop = self.loop
+        items = asyncio.Queue(maxsize=STREAM_BUFFER_ITEMS)
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    await items.put(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await items.put(e)
+            finally:
+                await agen.aclose()
+            await items.put(done)
+
+        pumping = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(items.get(), loop).result()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            pumping.cancel()
+
+
+providers = ProviderClients()
+
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS
+
+
+def backoff_delay(attempt):
+    # Full jitter: spread retries of many learners hitting the same outage over the whole window
+    return random.uniform(0, min(PROVIDER_BACKOFF_MAX, PROVIDER_BACKOFF_BASE * 2 ** attempt))
+
+
+# Call `make_request()` under the provider's concurrency limit, retrying transient failures
+async def with_retries(provider, make_request):
+    for attempt in range(PROVIDER_MAX_RETRIES + 1):
+        try:
+            async with providers.semaphores[provider]:
+                return await make_request()
+        except Exception as e:
+            if attempt == PROVIDER_MAX_RETRIES or not is_retryable(e):
+                raise
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+async def aget_answer(messages, system_prompt):
+    messages = [{"role": "system", "content": system_prompt}] + messages
+    response = await with_retries("groq", lambda: providers.groq.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages
+    ))
+    return response.choices[0].message.content
+
+
+async def astream_answer(messages, system_prompt):
+    messages = [{"role": "system", "content": system_prompt}] + messages
+    # Only opening the stream is retried; once tokens flow a failure is surfaced to the caller
+    stream = await with_retries("groq", lambda: providers.groq.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        stream=True
+    ))
+    async with providers.semaphores["groq"]:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+
+async def aspeech_to_text(audio_file):
+    async def transcribe():
+        # A retry has to upload the clip again from the start; audio_file may be a (name, content) tuple
+        content = audio_file[1] if isinstance(audio_file, tuple) else audio_file
+        if hasattr(content, "seek"):
+            content.seek(0)
+        return await providers.openai.audio.transcriptions.create(
+            model=STT_MODEL,
+            response_format="text",
+            file=audio_file
+        )
+    return await with_retries("openai", transcribe)
+
+
+async def astream_speech(input_text, model, voice, chunk_size):
+    for attempt in range(PROVIDER_MAX_RETRIES + 1):
+        started = False
+        try:
+            async with providers.semaphores["openai"]:
+                async with providers.openai.audio.speech.with_streaming_response.create(
+                    model=model,
+                    voice=voice,
+                    input=input_text
+                ) as response:
+                    async for chunk in response.iter_bytes(chunk_size):
+                        started = True
+                        yield chunk
+            return
+        except Exception as e:
+            # Audio already handed to the player can't be taken back, so only retry before the first chunk
+            if started or attempt == PROVIDER_MAX_RETRIES or not is_retryable(e):
+                raise
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+# Synchronous adapters for the Streamlit scripts
+def get_answer(messages, system_prompt):
+    return providers.run_sync(aget_answer(messages, system_prompt))
+
+
+def stream_answer(messages, system_prompt):
+    return providers.iterate_sync(astream_answer(messages, system_prompt))
+
+
+def speech_to_text(audio_file):
+    return providers.run_sync(aspeech_to_text(audio_file))
+
+
+def stream_speech(input_text, model, voice, chunk_size):
+    return providers.iterate_sync(astream_speech(input_text, model, voice, chunk_size))
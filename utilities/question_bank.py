@@ -0,0 +1,96 @@
+import hashlib
+import json
+import random
+import re
+from collections import namedtuple
+
+# Interview questions from koshen.json indexed by scenario, level and topic. A learner gets one
+# sample per interview (drawn once and kept in the session), questions they have already been
+# asked are only reused once the unseen ones run out, and topics they scored badly on are drawn
+# more often. Entries are plain strings or {"question": ..., "topic": ...} objects; without an
+# explicit topic one is derived from the question's keywords.
+
+QUESTION_BANK_PATH = "koshen.json"
+# How much more likely a topic the learner scored 0 on is drawn than one they aced
+WEAK_TOPIC_BOOST = 3.0
+
+Question = namedtuple("Question", ["id", "text", "topic", "scenario", "level"])
+
+_WORD = re.compile(r"[A-Za-z][\w+#'-]*")
+_STOPWORDS = {
+    "a", "about", "an", "and", "are", "between", "can", "concept", "define", "describe", "difference",
+    "differences", "different", "do", "does", "explain", "for", "how", "i", "in", "is", "it", "its", "of",
+    "on", "one", "purpose", "some", "the", "their", "to", "use", "used", "using", "what", "what's", "when",
+    "where", "which", "why", "with", "work", "would", "you", "your",
+}
+
+
+# Short topic label from a question's first content words, e.g. "method overloading"
+def question_topic(text, scenario=""):
+    language = {word.lower() for word in _WORD.findall(scenario.replace("Interview", ""))}
+    ignored = _STOPWORDS | language | {word[:-2] for word in language if word.endswith("js")}
+    words = [word.lower().strip("'") for word in _WORD.findall(text)]
+    keywords = [word for word in words if word and word not in ignored]
+    return " ".join(keywords[:2]) or "general"
+
+
+def question_id(scenario, level, text):
+    return hashlib.sha1(f"{scenario}\x00{level}\x00{text}".encode("utf-8")).hexdigest()[:16]
+
+
+# Sampling weight per topic from the learner's mean score on it (0..1); unscored topics weigh 1
+def topic_weights(topic_scores, boost=WEAK_TOPIC_BOOST):
+    return {topic: 1 + (boost - 1) * (1 - min(1.0, max(0.0, score))) for topic, score in topic_scores.items()}
+
+
+class QuestionBank:
+    def __init__(self, data):
+        self._by_level = {}
+        self._by_topic = {}
+        self._by_id = {}
+        for scenario, levels in data.items():
+            for level, entries in levels.items():
+                questions = []
+                for entry in entries:
+                    text = entry["question"] if isinstance(entry, dict) else entry
+                    topic = entry.get("topic") if isinstance(entry, dict) else None
+                    question = Question(question_id(scenario, level, text), text,
+                                        topic or question_topic(text, scenario), scenario, level)
+                    questions.append(question)
+                    self._by_id[question.id] = question
+                    self._by_topic.setdefault((scenario, level, question.topic), []).append(question)
+                self._by_level[(scenario, level)] = tuple(questions)
+
+    def questions(self, scenario, level):
+        return self._by_level.get((scenario, level), ())
+
+    def by_topic(self, scenario, level, topic):
+        return tuple(self._by_topic.get((scenario, level, topic), ()))
+
+    def get(self, question_id):
+        return self._by_id.get(question_id)
+
+    # Draw `count` questions: unseen ones first, weighted by topic, then the least recently asked.
+    # `asked` maps question id -> when the learner was last asked it.
+    def sample(self, scenario, level, count, asked=None, weights=None, rng=random):
+        asked = asked or {}
+        weights = weights or {}
+        pool = self.questions(scenario, level)
+        unseen = [question for question in pool if question.id not in asked]
+        # Weighted sampling without replacement (Efraimidis-Spirakis): keep the largest u ** (1 / w)
+        keyed = sorted(unseen, key=lambda question: rng.random() ** (1 / weights.get(question.topic, 1.0)), reverse=True)
+        selection = keyed[:count]
+        if len(selection) < count:
+            seen = sorted((question for question in pool if question.id in asked), key=lambda question: asked[question.id])
+            selection.extend(seen[:count - len(selection)])
+        return selection
+
+
+# The question list as it goes into the interviewer's system prompt
+def format_question_list(questions):
+    return str([question.text for question in questions])
+
+
+def load_question_bank(path=QUESTION_BANK_PATH):
+    with open(path, "r", encoding="utf-8") as file:
+        return QuestionBank(json.load(file))
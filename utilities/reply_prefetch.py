@@ -0,0 +1,88 @@
+import logging
+import os
+import time
+
+from utilities.concurrency import get_executor
+from utilities.grading import normalize_text
+
+# Speculative replies for live conversation turns. While the learner is still talking, a stable
+# partial transcript (a pause, see utilities/live_speech.py) starts generating the reply the turn
+# would get if it ended there. When the turn ends, a prefetched reply whose transcript matches the
+# final one (after normalize_text) is used, usually already finished; otherwise the reply is
+# generated from the final transcript as before. PREFETCH_MAX_PER_TURN bounds the extra LLM/TTS
+# calls a turn can cost, and partials shorter than PREFETCH_MIN_WORDS words are not worth one.
+PREFETCH_MAX_PER_TURN = int(os.getenv("PREFETCH_MAX_PER_TURN", 3))
+PREFETCH_MIN_WORDS = int(os.getenv("PREFETCH_MIN_WORDS", 2))
+
+logger = logging.getLogger(__name__)
+
+
+class ReplyPrefetcher:
+    """
+    Per-conversation prefetch state; keep one in ``st.session_state`` next to the message list.
+
+    ``prefetch(text, prepare)`` and ``take(text, prepare)`` call ``prepare(text)`` on the script
+    thread (so it may read session state) and expect a no-argument call that produces the reply.
+    Prefetched calls run on the shared provider executor and must not use Streamlit APIs.
+    """
+
+    def __init__(self, max_per_turn=PREFETCH_MAX_PER_TURN, min_words=PREFETCH_MIN_WORDS):
+        self.max_per_turn = max_per_turn
+        self.min_words = min_words
+        self._pending = {}
+        self._turn_prefetches = 0
+        self.prefetched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.head_start_seconds = 0.0
+
+    def prefetch(self, text, prepare):
+        key = normalize_text(text)
+        if len(key.split()) < self.min_words or key in self._pending or self._turn_prefetches >= self.max_per_turn:
+            return False
+        # Speech usually goes on after a pause; drop older prefetches that haven't started yet
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending[key] = (get_executor().submit(prepare(text)), time.monotonic())
+        self._turn_prefetches += 1
+        self.prefetched += 1
+        return True
+
+    # Return (reply, prefetched) for the final transcript of a turn and start a new turn
+    def take(self, text, prepare):
+        entry = self._pending.pop(normalize_text(text), None)
+        self.reset()
+        if entry is not None:
+            future, submitted = entry
+            if not future.cancelled():
+                head_start = time.monotonic() - submitted
+                try:
+                    reply = future.result()
+                    self.hits += 1
+                    self.head_start_seconds += head_start
+                    return reply, True
+                except Exception as e:
+                    logger.warning("Prefetched reply failed, generating it again: %r", e)
+        self.misses += 1
+        return prepare(text)(), False
+
+    # Forget the turn's prefetches, e.g. when the conversation is reset
+    def reset(self):
+        for future, _ in self._pending.values():
+            if not future.cancel():
+                self.wasted += 1
+        self._pending = {}
+        self._turn_prefetches = 0
+
+    def stats(self):
+        turns = self.hits + self.misses
+        return {
+            "turns": turns,
+            "prefetched": self.prefetched,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / turns if turns else 0.0,
+            "wasted": self.wasted,
+            "mean_head_start_seconds": self.head_start_seconds / self.hits if self.hits else 0.0,
+        }
@@ -0,0 +1,35 @@
+import time
+
+import numpy as np
+
+
+# Cosine similarity of each answer with its own reference, computed for the whole batch at once.
+# `store` is anything with an `encode(texts, persist) -> (n, dim) array` method, e.g. an EmbeddingStore.
+# Learner answers are never persisted; pass persist_expected=True only for fixed references that
+# repeat across sessions (e.g. curriculum answers), not for generated text.
+def batch_semantic_similarity(store, user_answers, expected_answers, persist_expected=False):
+    if len(user_answers) != len(expected_answers):
+        raise ValueError("user_answers and expected_answers must have the same length")
+    if not user_answers:
+        return {"scores": [], "timing": {"encode_seconds": 0.0, "score_seconds": 0.0, "total_seconds": 0.0, "items": 0}}
+
+    start = time.perf_counter()
+    answer_embeddings = np.asarray(store.encode(list(user_answers), persist=False), dtype=np.float32)
+    expected_embeddings = np.asarray(store.encode(list(expected_answers), persist=persist_expected), dtype=np.float32)
+    encoded = time.perf_counter()
+
+    # Diagonal of the cosine matrix only: row-wise dot product of the L2-normalized embeddings
+    answer_norms = np.maximum(np.linalg.norm(answer_embeddings, axis=1), 1e-12)
+    expected_norms = np.maximum(np.linalg.norm(expected_embeddings, axis=1), 1e-12)
+    scores = np.einsum("ij,ij->i", answer_embeddings, expected_embeddings) / (answer_norms * expected_norms)
+    scored = time.perf_counter()
+
+    return {
+        "scores": scores.tolist(),
+        "timing": {
+            "encode_seconds": encoded - start,
+            "score_seconds": scored - encoded,
+            "total_seconds": scored - start,
+            "items": len(user_answers),
+        },
+    }
@@ -0,0 +1,88 @@
+import queue
+import re
+import threading
+
+from utilities.concurrency import get_executor
+
+# Sentences shorter than this are merged with the next one so we don't synthesize tiny clips
+MIN_SENTENCE_CHARS = 20
+TTS_WORKERS = 3
+
+# End of sentence: terminal punctuation (optionally closed by a quote/bracket) followed by whitespace
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+_DONE = object()
+
+
+# Cut a stream of text deltas into sentences as soon as each one is complete.
+# Yields the raw text (including trailing whitespace) so joining the pieces gives back the full reply.
+def split_sentences(tokens, min_chars=MIN_SENTENCE_CHARS):
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        start = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            if match.end() == len(buffer) and not match.group().endswith("\n"):
+                # Could still be "e.g." or a decimal; wait for the next token to be sure
+                break
+            if len(buffer[start:match.end()].strip()) >= min_chars:
+                yield buffer[start:match.end()]
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer:
+        yield buffer
+
+
+# Synthesize sentences concurrently and yield (sentence, audio) pairs in their original order.
+# The sentence stream is drained on its own thread, so a clip is yielded as soon as it and
+# everything before it are ready, even while the model is still generating later sentences.
+# Synthesis runs on the shared provider executor (see utilities/concurrency.py), so TTS calls of all
+# sessions count against PROVIDER_WORKERS; at most max_workers of them belong to one reply.
+def speak_sentences(sentences, synthesize, max_workers=TTS_WORKERS):
+    ordered = queue.Queue()
+    slots = threading.Semaphore(max_workers)
+    stopped = threading.Event()
+
+    def release(_):
+        slots.release()
+
+    def produce():
+        try:
+            for sentence in sentences:
+                if stopped.is_set():
+                    return
+                text = sentence.strip()
+                future = None
+                if text:
+                    slots.acquire()
+                    if stopped.is_set():
+                        slots.release()
+                        return
+                    future = get_executor().submit(synthesize, text)
+                    future.add_done_callback(release)
+                ordered.put((sentence, future, None))
+        except Exception as e:
+            ordered.put((None, None, e))
+        finally:
+            ordered.put(_DONE)
+
+    threading.Thread(target=produce, name="tts-sentences", daemon=True).start()
+    try:
+        while True:
+            item = ordered.get()
+            if item is _DONE:
+                break
+            sentence, future, error = item
+            # Surface errors raised by the token stream itself
+            if error is not None:
+                raise error
+            yield sentence, future.result() if future else None
+    finally:
+        # The consumer stopped early: don't synthesize sentences nobody will play
+        stopped.set()
+        while True:
+            try:
+                item = ordered.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _DONE and item[1] is not None:
+                item[1].cancel()
@@ -0,0 +1,287 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Shared SQLite store for the learning path, webhook submissions and per-learner level progress.
+# WAL mode lets the Streamlit pages read while the webhook and Admin write, from any number of
+# processes; every operation is an indexed point read or write instead of a whole-file rewrite.
+CAS_DB_PATH = os.getenv("CAS_DB_PATH", "cas_learning.db")
+QUESTIONS_JSON = "questions.json"
+SUBMISSIONS_JSON = "submissions.json"
+# Path steps are ordered by a sparse key so a step can be moved or inserted without renumbering the rest
+PATH_ORDER_GAP = 1024.0
+# SQLite INTEGER range; larger ids raise OverflowError when bound to a statement
+SQLITE_INT_MIN = -2 ** 63
+SQLITE_INT_MAX = 2 ** 63 - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS path_steps (
+    id INTEGER PRIMARY KEY,
+    position REAL NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_path_steps_position ON path_steps (position);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    received_at REAL NOT NULL,
+    user_id TEXT,
+    step_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_user ON submissions (user_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_step ON submissions (step_id, received_at);
+
+CREATE TABLE IF NOT EXISTS level_progress (
+    user_id TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    level TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, scenario)
+);
+
+CREATE TABLE IF NOT EXISTS question_history (
+    user_id TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    level TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    asked_at REAL NOT NULL,
+    score REAL,
+    PRIMARY KEY (user_id, scenario, level, question_id)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class Storage:
+    def __init__(self, path=CAS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self.conn.executescript(SCHEMA)
+
+    # One connection per thread; Streamlit runs each session's script on its own thread
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    # BEGIN IMMEDIATE takes the write lock up front, so read-then-write sequences can't interleave
+    def transaction(self):
+        return _Transaction(self.conn)
+
+    # --- Submissions ---
+
+    def append(self, submission):
+        self.append_many([submission])
+
+    def append_many(self, submissions):
+        now = time.time()
+        rows = [
+            (now, _submission_user(s), _submission_step(s), json.dumps(s, ensure_ascii=False))
+            for s in submissions
+        ]
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO submissions (received_at, user_id, step_id, data) VALUES (?, ?, ?, ?)", rows)
+
+    def read_all(self):
+        for row in self.conn.execute("SELECT data FROM submissions ORDER BY id"):
+            yield json.loads(row["data"])
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+
+    def submissions_for_user(self, user_id):
+        rows = self.conn.execute("SELECT data FROM submissions WHERE user_id = ? ORDER BY received_at", (user_id,))
+        return [json.loads(row["data"]) for row in rows]
+
+    def flush(self):
+        pass  # every transaction is already durable once committed
+
+    # --- Level progress ---
+
+    def get_level_progress(self, user_id):
+        rows = self.conn.execute("SELECT scenario, level FROM level_progress WHERE user_id = ?", (user_id,))
+        return {row["scenario"]: row["level"] for row in rows}
+
+    def set_level(self, user_id, scenario, level):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO level_progress (user_id, scenario, level, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, scenario) DO UPDATE SET level = excluded.level, updated_at = excluded.updated_at",
+                (user_id, scenario, level, time.time()),
+            )
+
+    # --- Interview question history ---
+
+    # When each question of this scenario/level was last asked to the learner, by question id
+    def asked_questions(self, user_id, scenario, level):
+        rows = self.conn.execute(
+            "SELECT question_id, asked_at FROM question_history WHERE user_id = ? AND scenario = ? AND level = ?",
+            (user_id, scenario, level),
+        )
+        return {row["question_id"]: row["asked_at"] for row in rows}
+
+    def record_questions_asked(self, user_id, questions):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO question_history (user_id, scenario, level, question_id, topic, asked_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, scenario, level, question_id) DO UPDATE SET asked_at = excluded.asked_at",
+                [(user_id, q.scenario, q.level, q.id, q.topic, now) for q in questions],
+            )
+
+    # `scored` is a list of (question, score) pairs
+    def record_question_scores(self, user_id, scored):
+        with self.transaction() as conn:
+            conn.executemany(
+                "UPDATE question_history SET score = ? WHERE user_id = ? AND scenario = ? AND level = ? AND question_id = ?",
+                [(score, user_id, q.scenario, q.level, q.id) for q, score in scored],
+            )
+
+    # Mean score per topic over every level of a scenario
+    def topic_scores(self, user_id, scenario):
+        rows = self.conn.execute(
+            "SELECT topic, AVG(score) AS score FROM question_history "
+            "WHERE user_id = ? AND scenario = ? AND score IS NOT NULL GROUP BY topic",
+            (user_id, scenario),
+        )
+        return {row["topic"]: row["score"] for row in rows}
+
+    # --- Migration from the JSON files ---
+
+    # Steps whose id is missing, not an integer or already used (the old len(...) + 1 scheme repeats
+    # ids after a deletion) get fresh ids above every existing one instead of overwriting a step
+    def migrate_json(self, questions_path=QUESTIONS_JSON, submissions_path=SUBMISSIONS_JSON, submission_log_dir=None):
+        migrated = {"steps": 0, "renumbered_steps": 0, "submissions": 0}
+        with self.transaction() as conn:
+            done = {row["key"] for row in conn.execute("SELECT key FROM meta WHERE key LIKE 'migrated_%'")}
+
+            if "migrated_questions" not in done:
+                steps = [step for step in _load_json(questions_path, {"questions": []}).get("questions", []) if isinstance(step, dict)]
+                used = {row["id"] for row in conn.execute("SELECT id FROM path_steps")}
+                step_ids = []
+                for step in steps:
+                    step_id = _as_int64(step.get("id"))
+                    if step_id is not None and step_id not in used:
+                        used.add(step_id)
+                        step_ids.append(step_id)
+                    else:
+                        step_ids.append(None)
+                counter = conn.execute("SELECT value FROM meta WHERE key = 'next_step_id'").fetchone()
+                next_id = max([max(used, default=0) + 1] + ([int(counter["value"])] if counter else []))
+                for position, (step, step_id) in enumerate(zip(steps, step_ids), start=1):
+                    if step_id is None:
+                        step_id, next_id = next_id, next_id + 1
+                        step = dict(step, id=step_id)
+                        migrated["renumbered_steps"] += 1
+                    conn.execute(
+                        "INSERT INTO path_steps (id, position, type, data) VALUES (?, ?, ?, ?)",
+                        (step_id, position * PATH_ORDER_GAP, step.get("type", ""), json.dumps(step, ensure_ascii=False)),
+                    )
+                if migrated["renumbered_steps"]:
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_step_id', ?)", (str(next_id),))
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_questions', ?)", (str(time.time()),))
+                migrated["steps"] = len(steps)
+
+            if "migrated_submissions" not in done:
+                submissions = list(_load_json(submissions_path, []))
+                if submission_log_dir and os.path.isdir(submission_log_dir):
+                    from utilities.submission_log import SubmissionLog
+                    submissions.extend(SubmissionLog(submission_log_dir).read_all())
+                now = time.time()
+                conn.executemany(
+                    "INSERT INTO submissions (received_at, user_id, step_id, data) VALUES (?, ?, ?, ?)",
+                    [(now, _submission_user(s), _submission_step(s), json.dumps(s, ensure_ascii=False)) for s in submissions],
+                )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_submissions', ?)", (str(time.time()),))
+                migrated["submissions"] = len(submissions)
+        return migrated
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            return json.load(file)
+        except json.JSONDecodeError:
+            return default
+
+
+def _submission_user(submission):
+    if not isinstance(submission, dict):
+        return None
+    user = submission.get("user_id") or submission.get("userId") or submission.get("email")
+    return str(user) if user is not None else None
+
+
+# The value as an int if it is one and fits an SQLite INTEGER, else None
+def _as_int64(value):
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return number if SQLITE_INT_MIN <= number <= SQLITE_INT_MAX else None
+
+
+# Step a submission refers to; ids that aren't integers or don't fit an SQLite INTEGER count as none
+def _submission_step(submission):
+    if not isinstance(submission, dict):
+        return None
+    return _as_int64(submission.get("step_id") or submission.get("question_id") or submission.get("id"))
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+# Process-wide store; the JSON files are imported the first time the database is opened
+def get_storage():
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = Storage()
+            _storage.migrate_json(submission_log_dir=os.getenv("SUBMISSION_LOG_DIR", "submissions"))
+        return _storage
+
+
+if __name__ == '__main__':
+    # python -m utilities.storage migrate | export [questions.json]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        print(json.dumps(Storage().migrate_json(submission_log_dir=os.getenv("SUBMISSION_LOG_DIR", "submissions"))))
+    elif command == "export":
+        from utilities.path_repository import PathRepository
+        PathRepository(Storage()).export_json(sys.argv[2] if len(sys.argv) > 2 else QUESTIONS_JSON)
+    else:
+        print("usage: python -m utilities.storage migrate | export [questions.json]")
@@ -0,0 +1,213 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from utilities import providers
+
+# Speech-to-text backends behind utils.speech_to_text:
+#   remote  OpenAI whisper-1 through the shared provider layer (default)
+#   local   a quantized Whisper model (faster-whisper, int8 on CPU) in a pool of worker processes
+#   auto    local for short, constrained answers (the quiz/read-aloud steps in Paths) no longer
+#           than STT_LOCAL_MAX_SECONDS, remote for everything else
+# faster-whisper is optional; without it (or if a local run fails) clips go to the remote backend.
+STT_BACKEND = os.getenv("STT_BACKEND", "remote")
+STT_LOCAL_MODEL = os.getenv("STT_LOCAL_MODEL", "base.en")
+STT_LOCAL_COMPUTE_TYPE = os.getenv("STT_LOCAL_COMPUTE_TYPE", "int8")
+STT_LOCAL_WORKERS = int(os.getenv("STT_LOCAL_WORKERS", 2))
+# Threads each worker's model may use; keep workers * threads at or below the core count
+STT_LOCAL_THREADS = int(os.getenv("STT_LOCAL_THREADS", 2))
+STT_LOCAL_MAX_SECONDS = float(os.getenv("STT_LOCAL_MAX_SECONDS", 8))
+STT_LOCAL_TIMEOUT = float(os.getenv("STT_LOCAL_TIMEOUT", 30))
+# Local jobs allowed in flight before further clips go remote (default: one per worker)
+STT_LOCAL_MAX_PENDING = int(os.getenv("STT_LOCAL_MAX_PENDING", STT_LOCAL_WORKERS))
+
+BACKENDS = ("remote", "local", "auto")
+
+# --- Worker process side ---
+
+_worker_model = None
+
+
+def _init_worker(model_name, compute_type, threads):
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads)
+
+
+def _worker_ready():
+    return _worker_model is not None
+
+
+def _worker_transcribe(audio):
+    segments, _ = _worker_model.transcribe(io.BytesIO(audio), beam_size=1, language="en", vad_filter=False)
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+# --- Pool ---
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_local_unavailable = None
+_warmed_up = False
+# Set once a worker has loaded its model; until then local clips go to the remote backend
+_pool_ready = threading.Event()
+# Local jobs submitted and not finished yet (including ones abandoned after a timeout)
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def local_available():
+    global _local_unavailable
+    if _local_unavailable is None:
+        try:
+            import faster_whisper  # noqa: F401
+            _local_unavailable = False
+        except ImportError:
+            logger.warning("faster-whisper is not installed; local speech-to-text falls back to the remote backend")
+            _local_unavailable = True
+    return not _local_unavailable
+
+
+def _mark_local_unavailable(error):
+    global _local_unavailable
+    if not _local_unavailable:
+        logger.error("Local speech-to-text pool is broken, using the remote backend from now on: %s", error)
+    _local_unavailable = True
+
+
+# Worker processes are spawned, not forked, so they don't inherit the server's threads and event loop
+def get_local_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=STT_LOCAL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(STT_LOCAL_MODEL, STT_LOCAL_COMPUTE_TYPE, STT_LOCAL_THREADS),
+            )
+        return _pool
+
+
+def _on_worker_ready(future):
+    try:
+        if future.result():
+            _pool_ready.set()
+    except BrokenProcessPool as e:
+        _mark_local_unavailable(e)
+    except Exception:
+        pass
+
+
+# Start the workers and load their models in the background, so the first answer doesn't wait
+def warm_up(backend=None):
+    global _warmed_up
+    if (backend or STT_BACKEND) == "remote" or _warmed_up or not local_available():
+        return
+    _warmed_up = True
+    pool = get_local_pool()
+    for _ in range(STT_LOCAL_WORKERS):
+        pool.submit(_worker_ready).add_done_callback(_on_worker_ready)
+
+
+# Block until a worker has loaded its model (e.g. before benchmarking); False on timeout
+def wait_until_ready(timeout=None):
+    warm_up("local")
+    return local_available() and _pool_ready.wait(timeout)
+
+
+def local_pending():
+    with _pending_lock:
+        return _pending
+
+
+# Clips go to the pool only when a worker is ready and fewer than STT_LOCAL_MAX_PENDING jobs are
+# waiting; otherwise they'd queue behind slow or loading jobs and end up slower than remote
+def local_has_capacity():
+    return _pool_ready.is_set() and local_pending() < STT_LOCAL_MAX_PENDING
+
+
+# --- Routing ---
+
+def clip_seconds(audio):
+    try:
+        with wave.open(io.BytesIO(audio), "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError):
+        return None
+
+
+def choose_backend(audio, short_answer=False, backend=None):
+    backend = backend or STT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown STT backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if backend == "auto":
+        seconds = clip_seconds(audio)
+        use_local = short_answer and seconds is not None and seconds <= STT_LOCAL_MAX_SECONDS
+        backend = "local" if use_local else "remote"
+    if backend == "local":
+        if not local_available():
+            return "remote"
+        # Load the models in the background if nothing has started the pool yet
+        warm_up(backend)
+        if not local_has_capacity():
+            return "remote"
+    return backend
+
+
+def _job_done(_):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+class LocalSaturated(Exception):
+    pass
+
+
+def transcribe_local(audio):
+    global _pending
+    with _pending_lock:
+        # Checked again here: concurrent clips may have taken the last slots since routing
+        if _pending >= STT_LOCAL_MAX_PENDING:
+            raise LocalSaturated()
+        _pending += 1
+    try:
+        future = get_local_pool().submit(_worker_transcribe, audio)
+    except Exception:
+        _job_done(None)
+        raise
+    future.add_done_callback(_job_done)
+    try:
+        return future.result(timeout=STT_LOCAL_TIMEOUT)
+    except TimeoutError:
+        # Don't leave it queued behind the jobs in progress; a job already running still counts as
+        # pending until it finishes, so later clips go remote meanwhile
+        future.cancel()
+        raise
+
+
+def transcribe_remote(audio, filename):
+    return providers.speech_to_text((filename, audio))
+
+
+# Transcribe in-memory audio with the routed backend; a failed local run is retried remotely
+def transcribe(audio, filename, short_answer=False, backend=None):
+    if choose_backend(audio, short_answer, backend) == "local":
+        try:
+            return transcribe_local(audio)
+        except LocalSaturated:
+            pass
+        except BrokenProcessPool as e:
+            # A worker couldn't load the model (or died); stop routing clips to the pool
+            _mark_local_unavailable(e)
+        except Exception as e:
+            logger.warning("Local speech-to-text failed, using the remote backend: %r", e)
+    return transcribe_remote(audio, filename)
@@ -0,0 +1,263 @@
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Submissions are appended as one JSON object per line to numbered segment files
+# (segment-00000001.jsonl, ...). Only the newest segment is ever written to; once it passes
+# SEGMENT_MAX_BYTES a new one is started, and sealed segments can be merged by compact().
+SUBMISSION_LOG_DIR = os.getenv("SUBMISSION_LOG_DIR", "submissions")
+SEGMENT_MAX_BYTES = int(os.getenv("SUBMISSION_SEGMENT_MAX_BYTES", 16 * 1024 * 1024))
+# fsync after this many appends or this many seconds, whichever comes first (0 = every append);
+# a background timer makes sure the interval also holds when no further append comes
+FSYNC_EVERY = int(os.getenv("SUBMISSION_FSYNC_EVERY", 32))
+FSYNC_INTERVAL = float(os.getenv("SUBMISSION_FSYNC_INTERVAL", 1.0))
+
+_SEGMENT_NAME = re.compile(r"segment-(\d{8})\.jsonl$")
+
+
+class _DirectoryLock:
+    """Advisory lock on ``<dir>/.lock`` shared by every process writing to the log."""
+
+    def __init__(self, path, shared=False):
+        self.path = path
+        self.shared = shared
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class SubmissionLog:
+    """
+    Append-only JSONL segment log of webhook submissions.
+
+    Appends are O(1): one ``write`` to the end of the active segment under an
+    inter-process lock, with fsyncs batched by count and time. ``close()``
+    syncs what is still pending.
+    """
+
+    def __init__(self, directory=SUBMISSION_LOG_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._dirty_paths = set()
+        self._sync_timer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _lock_path(self):
+        return os.path.join(self.directory, ".lock")
+
+    def segment_path(self, number):
+        return os.path.join(self.directory, f"segment-{number:08d}.jsonl")
+
+    def segments(self):
+        numbers = []
+        for path in glob.glob(os.path.join(self.directory, "segment-*.jsonl")):
+            match = _SEGMENT_NAME.search(path)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    # Newest segment, rolling over to a new one when it is full. Caller holds the directory lock.
+    def _active_segment(self, incoming_bytes):
+        numbers = self.segments()
+        if not numbers:
+            return self.segment_path(1)
+        path = self.segment_path(numbers[-1])
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size and size + incoming_bytes > self.segment_max_bytes:
+            return self.segment_path(numbers[-1] + 1)
+        return path
+
+    def append(self, submission):
+        self.append_many([submission])
+
+    def append_many(self, submissions):
+        if not submissions:
+            return
+        with self._lock, _DirectoryLock(self._lock_path()):
+            self._append_locked(submissions)
+
+    # Caller holds both self._lock and the directory lock
+    def _append_locked(self, submissions):
+        payload = "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in submissions).encode("utf-8")
+        path = self._active_segment(len(payload))
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # A crash mid-write can leave a torn last line; start on a fresh line so only that
+            # line is lost on replay, not the first record appended after it
+            size = os.fstat(fd).st_size
+            if size:
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    payload = b"\n" + payload
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+        self._dirty_paths.add(path)
+        self._unsynced += len(submissions)
+        if (self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self._sync()
+        else:
+            self._schedule_sync()
+
+    # Sync pending appends after fsync_interval even if no later append triggers it.
+    # Caller holds self._lock.
+    def _schedule_sync(self):
+        if self._sync_timer is not None:
+            return
+        self._sync_timer = threading.Timer(self.fsync_interval, self._timed_sync)
+        self._sync_timer.daemon = True
+        self._sync_timer.start()
+
+    def _timed_sync(self):
+        with self._lock:
+            self._sync_timer = None
+            if self._dirty_paths:
+                self._sync()
+
+    # fsync every segment written since the last sync. Caller holds self._lock.
+    def _sync(self):
+        for path in self._dirty_paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue  # merged away by compaction, which syncs its own output
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._dirty_paths.clear()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    # Sync everything pending and stop the background timer
+    def close(self):
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._sync()
+
+    # Yield every stored submission in arrival order
+    def read_all(self):
+        # Open all segments under a shared lock so a concurrent compaction can't swap them mid-listing;
+        # the open handles stay readable even if compaction unlinks the files afterwards
+        with _DirectoryLock(self._lock_path(), shared=True):
+            files = [open(self.segment_path(n), "r", encoding="utf-8") for n in self.segments()]
+        for file in files:
+            with file:
+                for line in file:
+                    record = _parse_line(line)
+                    if record is not None:
+                        yield record
+
+    def count(self):
+        return sum(1 for _ in self.read_all())
+
+    # Merge all sealed segments (everything but the active one) into a single segment,
+    # dropping torn lines left by a crash mid-write. Safe to run while the webhook is serving.
+    def compact(self):
+        with self._lock, _DirectoryLock(self._lock_path()):
+            self._sync()
+            numbers = self.segments()
+            sealed = numbers[:-1]
+            if len(sealed) < 2:
+                return {"merged_segments": 0, "records": 0, "dropped_lines": 0}
+            target = self.segment_path(sealed[0])
+            tmp_path = f"{target}.compact"
+            records = dropped = 0
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                for number in sealed:
+                    with open(self.segment_path(number), "r", encoding="utf-8") as segment:
+                        for line in segment:
+                            record = _parse_line(line)
+                            if record is None:
+                                dropped += line.strip() != ""
+                                continue
+                            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                            records += 1
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, target)
+            for number in sealed[1:]:
+                os.remove(self.segment_path(number))
+            return {"merged_segments": len(sealed), "records": records, "dropped_lines": dropped}
+
+    # One-off import of the old read-modify-write submissions.json into an empty log
+    def import_legacy(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as file:
+            try:
+                legacy = json.load(file)
+            except json.JSONDecodeError:
+                return 0
+        if not legacy:
+            return 0
+        # Check and import under the lock so concurrently starting workers import it only once
+        with self._lock, _DirectoryLock(self._lock_path()):
+            if self.segments():
+                return 0
+            self._append_locked(legacy)
+            self._sync()
+        return len(legacy)
+
+
+def _parse_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+if __name__ == '__main__':
+    # python -m utilities.submission_log compact [directory]
+    if len(sys.argv) >= 2 and sys.argv[1] == "compact":
+        log = SubmissionLog(sys.argv[2] if len(sys.argv) > 2 else SUBMISSION_LOG_DIR)
+        print(json.dumps(log.compact()))
+    else:
+        print("usage: python -m utilities.submission_log compact [directory]")
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lightweight latency tracing. Wrap a stage in `with span("get_answer", session=traces):` and its
+# duration lands in a per-process histogram and, when given, in the session's own histograms.
+# Nothing leaves the process unless TRACE_EXPORT asks for it:
+#   TRACE_EXPORT=jsonl        append every span to TRACE_JSONL_PATH (on a background thread)
+#   TRACE_EXPORT=prometheus   serve Prometheus text at http://127.0.0.1:TRACE_PROMETHEUS_PORT/metrics
+#   TRACE_EXPORT=jsonl,prometheus
+TRACE_EXPORT = {name.strip() for name in os.getenv("TRACE_EXPORT", "").split(",") if name.strip()}
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+TRACE_PROMETHEUS_PORT = int(os.getenv("TRACE_PROMETHEUS_PORT", 9464))
+# Samples kept per histogram for the percentiles (reservoir sampling beyond that)
+TRACE_RESERVOIR_SIZE = int(os.getenv("TRACE_RESERVOIR_SIZE", 2048))
+
+QUANTILES = (50, 95, 99)
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, reservoir_size=TRACE_RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self.samples = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            if len(self.samples) < self.reservoir_size:
+                self.samples.append(seconds)
+            else:
+                # Keep a uniform sample of everything seen so far
+                index = random.randrange(self.count)
+                if index < self.reservoir_size:
+                    self.samples[index] = seconds
+
+    def percentile(self, q):
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))]
+
+    def summary(self):
+        summary = {"count": self.count, "mean": self.total / self.count if self.count else None, "max": self.max}
+        summary.update({f"p{q}": self.percentile(q) for q in QUANTILES})
+        return summary
+
+
+class Histograms:
+    """Histograms by stage name; one for the process and one per session (kept in ``st.session_state``)."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        histogram.record(seconds)
+
+    def summary(self):
+        with self._lock:
+            items = sorted(self._histograms.items())
+        return {name: histogram.summary() for name, histogram in items}
+
+
+process_histograms = Histograms()
+
+
+# Record a duration measured elsewhere (e.g. time to first audio)
+def record(name, seconds, session=None, **attributes):
+    process_histograms.record(name, seconds)
+    if session is not None:
+        session.record(name, seconds)
+    if "jsonl" in TRACE_EXPORT:
+        _jsonl_exporter().put({"ts": time.time(), "span": name, "seconds": round(seconds, 6), **attributes})
+
+
+@contextmanager
+def span(name, session=None, **attributes):
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if error:
+            attributes["error"] = error
+        record(name, time.perf_counter() - start, session, **attributes)
+
+
+# --- Exporters ---
+
+class _JsonlExporter:
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="trace-jsonl", daemon=True).start()
+
+    def put(self, event):
+        self._queue.put(event)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                events = [self._queue.get()]
+                while not self._queue.empty():
+                    events.append(self._queue.get())
+                file.write("".join(json.dumps(event) + "\n" for event in events))
+                file.flush()
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def _jsonl_exporter():
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = _JsonlExporter(TRACE_JSONL_PATH)
+        return _exporter
+
+
+def prometheus_text(histograms=process_histograms):
+    lines = [
+        "# HELP cas_stage_seconds Latency of a traced stage",
+        "# TYPE cas_stage_seconds summary",
+    ]
+    for name, summary in histograms.summary().items():
+        for q in QUANTILES:
+            if summary[f"p{q}"] is not None:
+                lines.append(f'cas_stage_seconds{{stage="{name}",quantile="{q / 100}"}} {summary[f"p{q}"]:.6f}')
+        lines.append(f'cas_stage_seconds_count{{stage="{name}"}} {summary["count"]}')
+        lines.append(f'cas_stage_seconds_sum{{stage="{name}"}} {(summary["mean"] or 0) * summary["count"]:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_metrics_server = None
+
+
+# Start the /metrics endpoint once per process when TRACE_EXPORT includes prometheus
+def start_exporters():
+    global _metrics_server
+    if "prometheus" not in TRACE_EXPORT:
+        return None
+    with _exporter_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer(("127.0.0.1", TRACE_PROMETHEUS_PORT), _MetricsHandler)
+            except OSError as e:
+                # Another worker on this host already serves the port; don't retry on every rerun
+                logger.warning("Trace metrics endpoint not started on port %d: %s", TRACE_PROMETHEUS_PORT, e)
+                _metrics_server = False
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="trace-metrics", daemon=True).start()
+        return _metrics_server or None
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Transcripts of recorded clips keyed by (session scope, SHA-256 of the audio bytes). Reruns often
+# re-deliver the same recorder payload and learners resubmit identical clips; those are answered
+# from here instead of another Whisper round trip. Entries are scoped to the session that recorded
+# them, expire after TRANSCRIPT_CACHE_TTL seconds and the least recently used are evicted beyond
+# TRANSCRIPT_CACHE_MAX_ITEMS.
+TRANSCRIPT_CACHE_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", 600))
+TRANSCRIPT_CACHE_MAX_ITEMS = int(os.getenv("TRANSCRIPT_CACHE_MAX_ITEMS", 2048))
+
+
+def audio_fingerprint(audio):
+    return hashlib.sha256(audio).hexdigest()
+
+
+class TranscriptCache:
+    def __init__(self, ttl=TRANSCRIPT_CACHE_TTL, max_items=TRANSCRIPT_CACHE_MAX_ITEMS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, scope, fingerprint):
+        key = (scope, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, scope, fingerprint, transcript):
+        with self._lock:
+            self._entries[(scope, fingerprint)] = (transcript, time.monotonic())
+            self._entries.move_to_end((scope, fingerprint))
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Drop everything a session cached, e.g. when it ends
+    def clear_scope(self, scope):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == scope]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+
+transcript_cache = TranscriptCache()
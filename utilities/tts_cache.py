@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Where synthesized clips are kept and how much disk they may use
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Recently played clips are also kept in memory so hot prompts skip the disk read
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", 16 * 1024 * 1024))
+
+
+class TTSCache:
+    """
+    Content-addressed, disk-backed cache of synthesized speech.
+
+    Clips are stored as ``<sha256>.mp3`` where the hash covers (model, voice, text),
+    so the same prompt is only ever synthesized once. The least recently used
+    clips are evicted once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, memory_bytes=TTS_CACHE_MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._memory = OrderedDict()  # key -> clip bytes, least recently used first
+        self._memory_total = 0
+        self._loaded = False
+
+    @staticmethod
+    def make_key(text, voice, model):
+        payload = json.dumps([model, voice, text], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    # Rebuild the LRU order from the files already on disk (mtime is bumped on every hit)
+    def _load_index(self):
+        if self._loaded:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def _forget(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        self._memory_total -= len(self._memory.pop(key, b""))
+
+    def _remember(self, key, audio_bytes):
+        self._memory_total -= len(self._memory.pop(key, b""))
+        if len(audio_bytes) > self.memory_bytes:
+            return
+        self._memory[key] = audio_bytes
+        self._memory_total += len(audio_bytes)
+        while self._memory_total > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_total -= len(evicted)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._memory_total -= len(self._memory.pop(key, b""))
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+
+    # Return the path of a cached clip, or None on a miss
+    def get(self, text, voice, model):
+        key = self.make_key(text, voice, model)
+        path = self.path_for(key)
+        with self._lock:
+            self._load_index()
+            if key in self._entries or os.path.exists(path):
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    # Evicted by another process since we indexed it
+                    self._forget(key)
+                else:
+                    if key not in self._entries:
+                        self._entries[key] = os.path.getsize(path)
+                        self._total_bytes += self._entries[key]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return path
+            self.misses += 1
+            return None
+
+    # Return the bytes of a cached clip, or None on a miss
+    def get_bytes(self, text, voice, model):
+        key = self.make_key(text, voice, model)
+        with self._lock:
+            audio_bytes = self._memory.get(key)
+            if audio_bytes is not None:
+                self._memory.move_to_end(key)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                return audio_bytes
+        path = self.get(text, voice, model)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                audio_bytes = f.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._remember(key, audio_bytes)
+        return audio_bytes
+
+    # Store a clip and return its path
+    def put(self, text, voice, model, audio_bytes):
+        key = self.make_key(text, voice, model)
+        path = self.path_for(key)
+        with self._lock:
+            self._load_index()
+            # Write to a private temp name first so concurrent readers never see a partial clip
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio_bytes)
+            os.replace(tmp_path, path)
+            self._forget(key)
+            self._entries[key] = len(audio_bytes)
+            self._total_bytes += len(audio_bytes)
+            self._remember(key, audio_bytes)
+            self._evict()
+        return path
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_total,
+            }
+
+
+tts_cache = TTSCache()
@@ -1,52 +1,208 @@
-from openai import OpenAI
-import os
-from groq import Groq
-from dotenv import load_dotenv
 import base64
+import os
+import uuid
 import streamlit as st
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
+import streamlit.components.v1 as components
+from utilities import providers, stt_backends
+from utilities.tts_cache import tts_cache
+from utilities.audio_preprocess import preprocess_audio
+from utilities.transcript_cache import transcript_cache, audio_fingerprint
 
-client = OpenAI(api_key=api_key)
+# Provider calls run on the shared async client layer (pooled connections, per-provider
+# concurrency limits, timeouts and jittered retries); these are its synchronous entry points.
 
-groq = Groq(api_key=os.getenv("GROQ_API_KEY"))
+TTS_MODEL = "tts-1"
+TTS_VOICE = "nova"
+TTS_CHUNK_SIZE = 4096
+# Bytes of MP3 to buffer before the first segment starts playing in autoplay_audio_stream
+AUDIO_SEGMENT_BYTES = 24 * 1024
 
 def get_answer(messages, system_prompt):
-    system_message = [{"role": "system", "content": system_prompt}]
-    messages = system_message + messages
-    response = groq.chat.completions.create(
-        model="LLaMA3-70b-8192",
-        messages=messages
-    )
-    return response.choices[0].message.content
-
-def speech_to_text(audio_data):
-    with open(audio_data, "rb") as audio_file:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            response_format="text",
-            file=audio_file
-        )
+    return providers.get_answer(messages, system_prompt)
+
+# Same as get_answer, but yields the reply as it is generated
+def stream_answer(messages, system_prompt):
+    return providers.stream_answer(messages, system_prompt)
+
+# Upload name for a recorded clip, from its container's magic bytes (Whisper goes by the extension)
+def _audio_filename(audio):
+    header = bytes(audio[:4])
+    if header == b"RIFF":
+        return "answer.wav"
+    if header == b"OggS":
+        return "answer.ogg"
+    if header == b"\x1aE\xdf\xa3":
+        return "answer.webm"
+    if header[:3] == b"ID3" or (header[:1] == b"\xff" and header[1:2] >= b"\xe0"):
+        return "answer.mp3"
+    return "answer.wav"
+
+# Transcribe a recorded clip: bytes straight from the recorder, a binary buffer, or a file path.
+# Every input is read into memory once and goes through the same path: preprocessing (see
+# utilities/audio_preprocess.py) and local/remote routing (see utilities/stt_backends.py).
+# With a cache_scope (see transcript_scope), a clip this session already transcribed is answered
+# from the transcript cache.
+# short_answer marks short, constrained answers that STT_BACKEND=auto may transcribe locally.
+def speech_to_text(audio_data, cache_scope=None, short_answer=False):
+    name = None
+    if isinstance(audio_data, (bytes, bytearray, memoryview)):
+        audio = bytes(audio_data) if not isinstance(audio_data, bytes) else audio_data
+    elif hasattr(audio_data, "read"):
+        name = getattr(audio_data, "name", None)
+        audio = audio_data.read()
+    else:
+        name = audio_data
+        with open(audio_data, "rb") as audio_file:
+            audio = audio_file.read()
+    fingerprint = audio_fingerprint(audio) if cache_scope is not None else None
+    if fingerprint is not None:
+        cached_transcript = transcript_cache.get(cache_scope, fingerprint)
+        if cached_transcript is not None:
+            return cached_transcript
+    # Trim the silence around the answer and convert to 16 kHz mono before uploading
+    upload, _ = preprocess_audio(audio)
+    # A converted clip is WAV; otherwise keep the caller's file name (Whisper goes by the extension)
+    if upload is audio and isinstance(name, str):
+        filename = os.path.basename(name)
+    else:
+        filename = _audio_filename(upload)
+    transcript = stt_backends.transcribe(upload, filename, short_answer=short_answer)
+    if fingerprint is not None and transcript:
+        transcript_cache.put(cache_scope, fingerprint, transcript)
     return transcript
 
+# Scope of this session's cached transcripts; read it on the script thread and pass it to workers
+def transcript_scope():
+    if "transcript_scope" not in st.session_state:
+        st.session_state.transcript_scope = uuid.uuid4().hex
+    return st.session_state.transcript_scope
+
+def stream_speech(input_text, chunk_size=TTS_CHUNK_SIZE):
+    # Identical prompts are served from the cache without a network round trip
+    cached_audio = tts_cache.get_bytes(input_text, TTS_VOICE, TTS_MODEL)
+    if cached_audio is not None:
+        for start in range(0, len(cached_audio), chunk_size):
+            yield cached_audio[start:start + chunk_size]
+        return
+    chunks = []
+    for chunk in providers.stream_speech(input_text, TTS_MODEL, TTS_VOICE, chunk_size):
+        chunks.append(chunk)
+        yield chunk
+    tts_cache.put(input_text, TTS_VOICE, TTS_MODEL, b"".join(chunks))
+
 def text_to_speech(input_text):
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice="nova",
-        input=input_text
-    )
-    webm_file_path = "temp_audio_play.mp3"
-    with open(webm_file_path, "wb") as f:
-        response.stream_to_file(webm_file_path)
-    return webm_file_path
-
-def autoplay_audio(file_path: str):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode("utf-8")
+    return b"".join(stream_speech(input_text))
+
+def _audio_payload(audio):
+    # Accept raw MP3 bytes, or a path for callers that still hold one
+    if isinstance(audio, (bytes, bytearray)):
+        return bytes(audio)
+    with open(audio, "rb") as f:
+        return f.read()
+
+def autoplay_audio(audio):
+    b64 = base64.b64encode(_audio_payload(audio)).decode("utf-8")
     md = f"""
     <audio autoplay>
     <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
     </audio>
     """
-    st.markdown(md, unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(md, unsafe_allow_html=True)
+
+# Bitrates (kbps) by bitrate index, keyed by (MPEG-1?, layer)
+_MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by version bits (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1)
+_MP3_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+# Length in bytes of the frame whose header starts at data[i], or None if there is no valid header
+def _mp3_frame_length(data, i):
+    if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[i + 1] >> 3) & 0x03
+    layer = 4 - ((data[i + 1] >> 1) & 0x03)
+    bitrate_index = data[i + 2] >> 4
+    rate_index = (data[i + 2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0x0, 0xF) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (data[i + 2] >> 1) & 0x01
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+# Regroup a stream of MP3 chunks into independently playable segments cut on frame boundaries.
+# A cut point must be a valid header followed by another one exactly a frame length later, so sync
+# bits that happen to occur inside frame data aren't mistaken for a frame start. The scan resumes
+# where it stopped when the next chunk arrives instead of starting over.
+def split_mp3_segments(chunks, min_segment_bytes=AUDIO_SEGMENT_BYTES):
+    buffer = bytearray()
+    scan = min_segment_bytes
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while True:
+            cut = None
+            while scan + 4 <= len(buffer):
+                length = _mp3_frame_length(buffer, scan)
+                if length is None:
+                    scan += 1
+                    continue
+                if scan + length + 4 > len(buffer):
+                    # Wait for the data that holds the next header
+                    break
+                if _mp3_frame_length(buffer, scan + length) is not None:
+                    cut = scan
+                    break
+                scan += 1
+            if cut is None:
+                break
+            yield bytes(buffer[:cut])
+            del buffer[:cut]
+            scan = min_segment_bytes
+    if buffer:
+        yield bytes(buffer)
+
+_AUDIO_QUEUE_PLAYER = """
+<script>
+const host = window.parent;
+if (!host.casAudioQueue) {
+    const script = host.document.createElement("script");
+    script.textContent = `
+        window.casAudioQueue = [];
+        window.casAudioPlaying = false;
+        window.casPlayNext = function () {
+            const src = window.casAudioQueue.shift();
+            if (!src) { window.casAudioPlaying = false; return; }
+            window.casAudioPlaying = true;
+            const audio = new Audio(src);
+            audio.onended = window.casPlayNext;
+            audio.onerror = window.casPlayNext;
+            audio.play().catch(window.casPlayNext);
+        };
+    `;
+    host.document.head.appendChild(script);
+}
+host.casAudioQueue.push("data:audio/mp3;base64,{b64}");
+if (!host.casAudioPlaying) { host.casPlayNext(); }
+</script>
+"""
+
+# Queue one segment on a page-level player that plays segments back to back
+def enqueue_audio_segment(audio):
+    b64 = base64.b64encode(_audio_payload(audio)).decode("utf-8")
+    components.html(_AUDIO_QUEUE_PLAYER.replace("{b64}", b64), height=0)
+
+# Start playback as soon as the first segment of a streamed clip is available
+def autoplay_audio_stream(chunks, min_segment_bytes=AUDIO_SEGMENT_BYTES):
+    for segment in split_mp3_segments(chunks, min_segment_bytes):
+        enqueue_audio_segment(segment)
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from utilities.ingest_queue import IngestQueue, open_submission_store, validate_submission
+
+# ASGI version of webhook_server.py for production serving:
+#   uvicorn webhook_asgi:app --host 0.0.0.0 --port 5000 --workers 4
+#   python webhook_asgi.py --workers 4
+# Every worker process opens its own store connection and ingest queue when it starts (after the
+# fork), and the SQLite store / segment log serialise writes between processes, so workers share
+# the submission store safely. /webhook/stats reports on the worker that answered.
+
+ingest_queue = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global ingest_queue
+    ingest_queue = IngestQueue(open_submission_store())
+    try:
+        yield
+    finally:
+        ingest_queue.close()
+
+
+async def webhook(request):
+    try:
+        submission = json.loads(await request.body())
+    except ValueError:
+        submission = None
+    error = validate_submission(submission)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+    if not ingest_queue.submit(submission):
+        return JSONResponse(
+            {"error": "Too many submissions, retry later"},
+            status_code=429,
+            headers={"Retry-After": str(ingest_queue.retry_after())},
+        )
+    return JSONResponse({"message": "Submission received"})
+
+
+async def webhook_stats(request):
+    return JSONResponse(dict(ingest_queue.stats(), worker_pid=os.getpid()))
+
+
+app = Starlette(
+    routes=[
+        Route('/webhook', webhook, methods=['POST']),
+        Route('/webhook/stats', webhook_stats, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the submission webhook with uvicorn")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("WEBHOOK_PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEBHOOK_WORKERS", os.cpu_count() or 1)))
+    args = parser.parse_args()
+    uvicorn.run("webhook_asgi:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
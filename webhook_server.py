@@ -1,41 +1,36 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import json
+import atexit
 import os
+from utilities.ingest_queue import IngestQueue, open_submission_store, validate_submission
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize data
-if not os.path.exists('submissions.json'):
-    with open('submissions.json', 'w') as f:
-        json.dump([], f)
-
-if not os.path.exists('questions.json'):
-    with open('questions.json', 'w') as f:
-        json.dump({"questions": []}, f)
-
-# Load data from JSON files
-def load_json(file_path):
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
-    return []
-
-def save_json(file_path, data):
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
+# Development server; for production use the ASGI variant in webhook_asgi.py
+submission_store = open_submission_store()
+# Requests only validate and enqueue; a background writer stores submissions in batches
+ingest_queue = IngestQueue(submission_store)
+atexit.register(ingest_queue.close)
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
     try:
-        submission = request.json
-        submissions = load_json('submissions.json')
-        submissions.append(submission)
-        save_json('submissions.json', submissions)
+        submission = request.get_json(silent=True)
+        error = validate_submission(submission)
+        if error:
+            return jsonify({"error": error}), 400
+        if not ingest_queue.submit(submission):
+            response = jsonify({"error": "Too many submissions, retry later"})
+            response.headers["Retry-After"] = str(ingest_queue.retry_after())
+            return response, 429
         return jsonify({"message": "Submission received"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/webhook/stats', methods=['GET'])
+def webhook_stats():
+    return jsonify(ingest_queue.stats())
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    app.run(host='0.0.0.0', port=int(os.getenv("WEBHOOK_PORT", 5000)))
@@ -0,0 +1,63 @@
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from models.sentence_transformer import BACKENDS, DEFAULT_MODEL_NAME, SentenceTransformerModel
+
+QUESTION_BANK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "koshen.json")
+
+def load_pairs(path):
+    with open(path, "r", encoding="utf-8") as file:
+        bank = json.load(file)
+    pairs = []
+    for levels in bank.values():
+        for questions in levels.values():
+            pairs.extend(itertools.combinations(questions, 2))
+    return pairs
+
+def score_pairs(model, pairs, repeats):
+    left = [a for a, _ in pairs]
+    right = [b for _, b in pairs]
+    texts = sorted(set(left) | set(right))
+    model.encode(texts[:8])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        embeddings = model.encode(texts)
+    elapsed = (time.perf_counter() - start) / repeats
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    index = {text: i for i, text in enumerate(texts)}
+    a = embeddings[[index[t] for t in left]]
+    b = embeddings[[index[t] for t in right]]
+    return np.einsum("ij,ij->i", a, b), len(texts) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare similarity scores of each backend against the float32 PyTorch "
+                                                 "reference on every question pair within a scenario/level of koshen.json.")
+    parser.add_argument("--backend", action="append", choices=[b for b in BACKENDS if b != "torch"],
+                        help="Backend(s) to compare against float32 torch (default: all)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--bank", default=QUESTION_BANK)
+    parser.add_argument("--threshold", type=float, default=0.4, help="Pass/fail threshold used by the app")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.bank)
+    reference, reference_throughput = score_pairs(SentenceTransformerModel(args.model, "torch"), pairs, args.repeats)
+    print(f"{len(pairs)} pairs from {args.bank}")
+    print(f"{'backend':<10} {'sent/s':>8} {'speedup':>8} {'mean|d|':>9} {'max|d|':>9} {'flips':>7}")
+    print(f"{'torch':<10} {reference_throughput:8.1f} {1.0:8.2f} {0.0:9.4f} {0.0:9.4f} {0:7d}")
+
+    for backend in args.backend or [b for b in BACKENDS if b != "torch"]:
+        scores, throughput = score_pairs(SentenceTransformerModel(args.model, backend), pairs, args.repeats)
+        diff = np.abs(scores - reference)
+        flips = int(np.sum((scores >= args.threshold) != (reference >= args.threshold)))
+        print(f"{backend:<10} {throughput:8.1f} {throughput / reference_throughput:8.2f} "
+              f"{diff.mean():9.4f} {diff.max():9.4f} {flips:7d}")
+
+if __name__ == '__main__':
+    main()
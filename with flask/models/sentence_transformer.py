@@ -1,8 +1,33 @@
+import os
 from sentence_transformers import SentenceTransformer
 
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+# torch: float32 PyTorch (reference scores)
+# quantized: PyTorch with int8 dynamic quantization of the Linear layers
+# onnx: ONNX Runtime export of the float32 model
+# onnx-int8: ONNX Runtime with the pre-quantized int8 weights shipped in the model repo
+BACKENDS = ("torch", "quantized", "onnx", "onnx-int8")
+ONNX_INT8_FILE = os.getenv("SIMILARITY_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
 class SentenceTransformerModel:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, backend=None):
+        self.backend = backend or os.getenv("SIMILARITY_BACKEND", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown similarity backend '{self.backend}', expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.model = self._load(model_name, self.backend)
+
+    @staticmethod
+    def _load(model_name, backend):
+        if backend == "torch":
+            return SentenceTransformer(model_name)
+        if backend == "quantized":
+            import torch
+            model = SentenceTransformer(model_name, device="cpu")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        if backend == "onnx":
+            return SentenceTransformer(model_name, device="cpu", backend="onnx")
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs={"file_name": ONNX_INT8_FILE})
 
     def encode(self, text, convert_to_tensor=False):
         return self.model.encode(text, convert_to_tensor=convert_to_tensor)